@@ -1,12 +1,22 @@
+import logging
 import sys
 import os
 
 # Adiciona o diretório raiz ao PYTHONPATH
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Importa e executa o bot
-from src.bot.commands.music import bot, BOT_TOKEN
+from src.config.settings import BOT_TOKEN, SHARDING_SETTINGS
+from src.utils.logger import setup_logging
 
 if __name__ == "__main__":
-    print("Iniciando Amadeus Neural Network...")
-    bot.run(BOT_TOKEN)
\ No newline at end of file
+    setup_logging()
+    logging.getLogger(__name__).info("Iniciando Amadeus Neural Network...")
+    if SHARDING_SETTINGS['enabled']:
+        # Vários processos, cada um com uma faixa de shards
+        from src.bot.launcher import ShardLauncher
+        ShardLauncher().run()
+    else:
+        # Importa e executa o bot
+        from src.bot.commands.music import create_bot
+        # log_handler=None: o discord.py usa o logging já configurado (com a fila)
+        create_bot().run(BOT_TOKEN, log_handler=None)
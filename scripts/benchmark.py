@@ -0,0 +1,340 @@
+"""
+Benchmarks dos caminhos críticos do MusicManager.
+Roda offline: o cliente de voz, o extrator (yt-dlp) e o FFmpeg são simulados,
+então só o custo do próprio bot é medido.
+
+Uso:
+    python scripts/benchmark.py                        # imprime o JSON
+    python scripts/benchmark.py -o bench.json          # salva em arquivo
+    python scripts/benchmark.py --compare antigo.json  # compara com um resultado anterior
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+# Adiciona o diretório raiz ao PYTHONPATH
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from src.config.settings import (
+    CACHE_SETTINGS, AUDIO_CACHE_SETTINGS, SNAPSHOT_SETTINGS, PLAYBACK_SETTINGS
+)
+
+# Nada de disco: cache só em memória, sem cache de áudio e sem snapshot
+CACHE_SETTINGS['path'] = None
+AUDIO_CACHE_SETTINGS['enabled'] = False
+SNAPSHOT_SETTINGS['enabled'] = False
+
+import discord
+from src.core.audio_manager import MusicManager
+from src.core.player import Track
+from src.utils.logger import setup_logging
+
+
+class StubExtractor:
+    """Substitui o AudioExtractor: responde na hora (ou após `delay`) sem rede"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+
+    async def extract(self, search, ytdl_opts, guild_id=None, timeout=None, batch=False):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        video_id = f"{self.calls:011d}"
+        return {
+            'id': video_id,
+            'title': f"Música {self.calls}",
+            'duration': 180,
+            'url': f"https://stub.invalid/audio/{video_id}",
+            'webpage_url': f"https://www.youtube.com/watch?v={video_id}",
+            'acodec': 'opus'
+        }
+
+    async def iter_playlist(self, url, ytdl_opts, guild_id=None, max_entries=None):
+        return
+        yield
+
+    def cancel_guild(self, guild_id):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubSource(discord.AudioSource):
+    """Substitui o FFmpeg: entrega frames de silêncio"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def read(self):
+        return b'\xf8\xff\xfe'
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        pass
+
+
+class FakeVoiceClient:
+    """Cliente de voz falso: registra a fonte e permite terminar a música"""
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.channel = types.SimpleNamespace(id=guild.id, members=[])
+        self.source = None
+        self._after = None
+        self.played = None  # asyncio.Event setado a cada play()
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self.source is not None
+
+    def is_paused(self):
+        return False
+
+    def play(self, source, after=None):
+        self.source = source
+        self._after = after
+        if self.played is not None:
+            self.played.set()
+
+    def stop(self):
+        self.finish()
+
+    def finish(self):
+        """Simula o fim da música (o discord.py chama o after na thread do player)"""
+        after, self._after, self.source = self._after, None, None
+        if after:
+            after(None)
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+    async def send(self, *args, **kwargs):
+        return None
+
+
+class FakeBot:
+    """O mínimo do commands.Bot que o MusicManager usa"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.user = types.SimpleNamespace(id=0)
+        self.guilds = {}
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        return None
+
+    def is_closed(self):
+        return False
+
+
+class BenchMusicManager(MusicManager):
+    """MusicManager com FFmpeg e extrator simulados"""
+
+    def __init__(self, bot, extract_delay=0):
+        super().__init__(bot)
+        self.ffmpeg_info = {'version': 'stub', 'libopus': True}
+        self.extractor = StubExtractor(extract_delay)
+
+    def create_source(self, url, codec=None, local=False, start=0, gain=0):
+        return StubSource(url)
+
+
+def make_voice_client(bot, guild_id):
+    guild = types.SimpleNamespace(id=guild_id, voice_client=None)
+    voice_client = FakeVoiceClient(guild)
+    guild.voice_client = voice_client
+    bot.guilds[guild_id] = guild
+    return voice_client
+
+
+def percentiles(samples):
+    """Resumo das amostras em microssegundos"""
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return {
+        'n': len(samples),
+        'p50_us': round(pick(0.50) / 1000, 2),
+        'p99_us': round(pick(0.99) / 1000, 2),
+        'max_us': round(samples[-1] / 1000, 2),
+        'mean_us': round(sum(samples) / len(samples) / 1000, 2)
+    }
+
+
+async def bench_play_audio(iterations, guilds):
+    """Latência do play_audio (busca simulada + fila), distribuída entre servidores"""
+    bot = FakeBot(asyncio.get_running_loop())
+    manager = BenchMusicManager(bot)
+    clients = [make_voice_client(bot, guild_id) for guild_id in range(1, guilds + 1)]
+    channel = FakeTextChannel(1)
+    samples = []
+    for i in range(iterations):
+        voice_client = clients[i % guilds]
+        start = time.perf_counter_ns()
+        await manager.play_audio(voice_client, channel, f"música {i}")
+        samples.append(time.perf_counter_ns() - start)
+    return percentiles(samples)
+
+
+async def bench_play_next(transitions):
+    """Tempo entre o fim de uma música e o play() da próxima"""
+    bot = FakeBot(asyncio.get_running_loop())
+    manager = BenchMusicManager(bot)
+    voice_client = make_voice_client(bot, 1)
+    voice_client.played = asyncio.Event()
+    channel = FakeTextChannel(1)
+    for i in range(transitions + 1):
+        await manager.play_audio(voice_client, channel, f"música {i}")
+
+    samples = []
+    for _ in range(transitions):
+        voice_client.played.clear()
+        start = time.perf_counter_ns()
+        voice_client.finish()
+        await voice_client.played.wait()
+        samples.append(time.perf_counter_ns() - start)
+    return percentiles(samples)
+
+
+async def bench_queue_page(lengths, repeat):
+    """Custo do get_queue_page (última página, o pior caso) por tamanho de fila"""
+    bot = FakeBot(asyncio.get_running_loop())
+    manager = BenchMusicManager(bot)
+    results = {}
+    for length in lengths:
+        player = manager.get_player(length)
+        player.queue.extend(
+            Track(f"{i:011d}", f"Música {i}", 180, f"https://www.youtube.com/watch?v={i:011d}")
+            for i in range(length)
+        )
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            manager.get_queue_page(length, page=length)
+            samples.append(time.perf_counter_ns() - start)
+        results[str(length)] = percentiles(samples)
+    return results
+
+
+async def bench_memory(guild_counts, tracks_per_guild):
+    """Memória por servidor (player, fila e tasks) medida com tracemalloc"""
+    results = {}
+    for count in guild_counts:
+        bot = FakeBot(asyncio.get_running_loop())
+        manager = BenchMusicManager(bot)
+        clients = [make_voice_client(bot, guild_id) for guild_id in range(1, count + 1)]
+        channel = FakeTextChannel(1)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for voice_client in clients:
+            for i in range(tracks_per_guild):
+                await manager.play_audio(voice_client, channel, f"música {i}")
+        # Deixa as tasks em segundo plano (pré-carregamentos) terminarem
+        for _ in range(5):
+            await asyncio.sleep(0)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[str(count)] = {
+            'guilds': count,
+            'tracks_per_guild': tracks_per_guild,
+            'total_bytes': after - before,
+            'bytes_per_guild': round((after - before) / count)
+        }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+async def run(args):
+    results = {}
+    results['play_audio'] = await bench_play_audio(args.iterations, guilds=10)
+    results['play_next_transition'] = await bench_play_next(args.transitions)
+    results['get_queue_page'] = await bench_queue_page([10, 1000, 10000], args.repeat)
+    results['memory_per_guild'] = await bench_memory([10, 100, 10000], args.tracks)
+    return results
+
+
+def compare(old, new):
+    """Imprime a variação das métricas em relação a um resultado anterior"""
+    def walk(prefix, a, b):
+        for key, value in b.items():
+            if isinstance(value, dict):
+                walk(f"{prefix}{key}.", a.get(key, {}), value)
+            elif key.endswith(('_us', '_bytes', 'bytes_per_guild')) and a.get(key):
+                change = (value - a[key]) / a[key] * 100
+                print(f"{prefix}{key}: {a[key]} -> {value} ({change:+.1f}%)", file=sys.stderr)
+    walk('', old['results'], new['results'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do MusicManager")
+    parser.add_argument('-o', '--output', help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument('--compare', help="Resultado anterior (JSON) para comparar")
+    parser.add_argument('--iterations', type=int, default=2000, help="Chamadas de play_audio")
+    parser.add_argument('--transitions', type=int, default=500, help="Trocas de música medidas")
+    parser.add_argument('--repeat', type=int, default=50, help="Repetições do get_queue_page")
+    parser.add_argument('--tracks', type=int, default=5, help="Músicas por servidor no teste de memória")
+    args = parser.parse_args()
+
+    # Mede com o logging real (nível padrão, escrito em stderr pela thread de log)
+    setup_logging()
+    results = asyncio.run(run(args))
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {
+                'gapless': PLAYBACK_SETTINGS['gapless'],
+                'opus_passthrough': PLAYBACK_SETTINGS['opus_passthrough']
+            },
+            'args': vars(args)
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
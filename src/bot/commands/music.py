@@ -3,66 +3,184 @@ from discord.ext import commands
 import sys
 import os
 import asyncio
+import logging
+import re
+import time
+from pathlib import Path
 
 # Adiciona o diretório raiz ao PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.core.audio_manager import MusicManager
-from src.config.settings import BOT_TOKEN, YTDL_OPTIONS, MESSAGE_DELETE_TIMES
+from src.config.settings import (
+    BOT_TOKEN, YTDL_OPTIONS, MESSAGE_DELETE_TIMES, METRICS_SETTINGS, WATCHDOG_SETTINGS,
+    BULK_SETTINGS, QUEUE_PAGE_SETTINGS, MESSAGE_EXPIRY_SETTINGS
+)
+from src.utils.metrics import Histogram, LoopLagMonitor, MetricsServer
+from src.utils.logger import setup_logging
+from src.utils.watchdog import LoopWatchdog
+from src.utils.expiry import MessageExpiry
+from src.utils.scheduler import TimerHeap
+
+logger = logging.getLogger(__name__)
+
+COMMAND_SECONDS = Histogram(
+    'amadeus_command_seconds', 'Duração dos comandos de música', labels=('command',)
+)
+
+def format_queue_page(page):
+    """Monta o texto de uma página da fila (retorno de get_queue_page)"""
+    header = f"📋 **Fila de Músicas** ({page['total']} músicas)"
+    if page['pages'] > 1:
+        header += f" — página {page['page'] + 1}/{page['pages']}"
+    return f"{header}\n{page['text']}"
+
+
+class QueueView(discord.ui.View):
+    """Botões de navegação da fila: editam a mesma mensagem a cada página"""
+
+    def __init__(self, music, expiry, guild_id, page):
+        super().__init__(timeout=QUEUE_PAGE_SETTINGS['timeout'])
+        self.music = music
+        self.expiry = expiry
+        self.guild_id = guild_id
+        self.message = None
+        self._sync(page)
+
+    def _sync(self, page):
+        self.page = page['page']
+        self.previous_page.disabled = page['page'] == 0
+        self.next_page.disabled = page['page'] >= page['pages'] - 1
+
+    async def _show(self, interaction, page_number):
+        # A fila pode ter mudado desde a última página: get_queue_page ajusta o número
+        page = self.music.get_queue_page(self.guild_id, page_number)
+        self._sync(page)
+        await interaction.response.edit_message(content=format_queue_page(page), view=self)
+        # Cada interação adia a remoção, junto com o timeout dos botões
+        self.expiry.schedule(self.message, self.timeout)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self._show(interaction, self.page + 1)
 
-# Configuração do bot
-intents = discord.Intents.default()
-intents.message_content = True
-intents.voice_states = True
-
-bot = commands.Bot(command_prefix='/', intents=intents)
 
 class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.music = MusicManager(bot)
+        self.metrics_server = None
+        self.loop_lag = None
+        self.watchdog = None
+        self.vote_timers = TimerHeap()  # Prazo das votações de skip por servidor
+
+        # Com sharding, cada processo guarda as próprias mensagens pendentes
+        expiry_settings = dict(MESSAGE_EXPIRY_SETTINGS)
+        shard_ids = getattr(bot, 'shard_ids', None)
+        if expiry_settings['path'] and shard_ids:
+            path = Path(expiry_settings['path'])
+            expiry_settings['path'] = str(path.with_name(f"{path.stem}-{min(shard_ids)}{path.suffix}"))
+        self.expiry = MessageExpiry(bot, expiry_settings)
 
     async def send_and_delete(self, ctx, message, success=True):
-        """Envia uma mensagem e a deleta após um tempo"""
+        """Envia uma mensagem e agenda a remoção dela após um tempo"""
         try:
             # Deleta a mensagem do comando imediatamente se for sucesso
             if success:
                 try:
                     await ctx.message.delete()
                 except Exception as e:
-                    print(f"[DEBUG] Erro ao deletar comando: {e}")
+                    logger.debug("Erro ao deletar comando: %s", e)
             
             # Envia a resposta
             response = await ctx.send(message)
-            
-            # Define o tempo de espera (1 minuto para sucesso, 3 para erro)
-            wait_time = 60 if success else 180
-            
-            # Espera e deleta a resposta em uma task separada
-            async def delete_response():
-                try:
-                    await asyncio.sleep(wait_time)
-                    await response.delete()
-                    
-                    # Se for erro, também deleta a mensagem do comando
-                    if not success:
-                        try:
-                            await ctx.message.delete()
-                        except Exception as e:
-                            print(f"[DEBUG] Erro ao deletar comando após erro: {e}")
-                except Exception as e:
-                    print(f"[DEBUG] Erro ao deletar resposta: {e}")
-            
-            # Cria uma task separada para deletar a resposta
-            asyncio.create_task(delete_response())
-            
+
+            # Agenda a remoção (1 minuto para sucesso, 3 para erro); se for erro,
+            # o comando também é apagado junto com a resposta
+            wait_time = MESSAGE_DELETE_TIMES['success' if success else 'error']
+            self.expiry.schedule(response, wait_time)
+            if not success:
+                self.expiry.schedule(ctx.message, wait_time)
+
         except Exception as e:
-            print(f"[DEBUG] Erro ao gerenciar mensagens: {e}")
+            logger.debug("Erro ao gerenciar mensagens: %s", e)
+
+    async def cog_load(self):
+        """Retoma as filas e as mensagens temporárias do último reinício e inicia as métricas e o watchdog"""
+        asyncio.create_task(self.music.restore_sessions())
+        await self.expiry.start()
+        if METRICS_SETTINGS['enabled']:
+            # Com sharding, cada processo expõe as métricas em uma porta própria
+            shard_ids = getattr(self.bot, 'shard_ids', None)
+            port = METRICS_SETTINGS['port'] + (min(shard_ids) if shard_ids else 0)
+            self.metrics_server = MetricsServer(METRICS_SETTINGS['host'], port)
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error("Não foi possível iniciar o servidor de métricas: %s", e)
+                self.metrics_server = None
+            self.loop_lag = LoopLagMonitor(METRICS_SETTINGS['loop_lag_interval'])
+            self.loop_lag.start()
+        if WATCHDOG_SETTINGS['enabled']:
+            self.watchdog = LoopWatchdog(
+                WATCHDOG_SETTINGS['threshold'], WATCHDOG_SETTINGS['interval'],
+                WATCHDOG_SETTINGS['stack_limit']
+            )
+            self.watchdog.start()
+
+    async def cog_unload(self):
+        self.music.audio_cache.close()
+        await self.expiry.close()
+        self.vote_timers.close()
+        self.music.editor.close()
+        self.music.loudness.close()
+        self.music.cache.close()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.loop_lag:
+            self.loop_lag.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+
+    async def cog_before_invoke(self, ctx):
+        ctx.started_at = time.perf_counter()
+
+    async def cog_after_invoke(self, ctx):
+        started_at = getattr(ctx, 'started_at', None)
+        if started_at is not None:
+            COMMAND_SECONDS.observe(time.perf_counter() - started_at, command=ctx.command.name)
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Arma/cancela o timer de inatividade quando usuários entram ou saem"""
+        self.music.handle_voice_state_update(member, before, after)
+
+    async def read_searches(self, ctx, search):
+        """
+        Lê as buscas do comando: uma por linha ou separadas por ";",
+        ou de um arquivo .txt anexado à mensagem.
+        """
+        text = search or ""
+        for attachment in ctx.message.attachments:
+            is_text = (attachment.content_type or "").startswith("text/") or attachment.filename.endswith(".txt")
+            if is_text and attachment.size <= BULK_SETTINGS['max_file_bytes']:
+                text += "\n" + (await attachment.read()).decode('utf-8', errors='replace')
+                break
+        return [line.strip() for line in re.split(r'[\n;]', text) if line.strip()]
 
     @commands.command(name='music')
-    async def music(self, ctx, *, search):
-        """Toca uma música do YouTube"""
+    async def music(self, ctx, *, search=None):
+        """Toca uma música do YouTube (ou várias: uma por linha, separadas por ";" ou em um .txt)"""
         try:
+            searches = await self.read_searches(ctx, search)
+            if not searches:
+                await self.send_and_delete(ctx, "❌ Informe o nome ou a URL de uma música!", False)
+                return
+
             # Verifica se o usuário está em um canal de voz
             if not ctx.author.voice:
                 await self.send_and_delete(ctx, "❌ Você precisa estar em um canal de voz para usar este comando!", False)
@@ -74,8 +192,11 @@ class Music(commands.Cog):
                 await self.send_and_delete(ctx, "❌ Não foi possível conectar ao canal de voz!", False)
                 return
 
-            # Toca a música
-            result = await self.music.play_audio(voice_client, ctx.channel, search)
+            # Toca a música (ou adiciona o lote, com um único resumo)
+            if len(searches) == 1:
+                result = await self.music.play_audio(voice_client, ctx.channel, searches[0])
+            else:
+                result = await self.music.play_many(voice_client, ctx.channel, searches)
             
             if result['success']:
                 # Se a música foi adicionada com sucesso, envia mensagem e deleta após 1 minuto
@@ -85,7 +206,7 @@ class Music(commands.Cog):
                 await self.send_and_delete(ctx, f"❌ Erro ao tocar música: {result['error']}", False)
 
         except Exception as e:
-            print(f"Erro no comando music: {e}")
+            logger.error("Erro no comando music: %s", e, exc_info=True)
             await self.send_and_delete(ctx, f"❌ Ocorreu um erro: {str(e)}", False)
 
     @commands.command(name='stop')
@@ -105,7 +226,7 @@ class Music(commands.Cog):
             await ctx.send("⏹️ Reprodução parada e fila limpa!")
 
         except Exception as e:
-            print(f"Erro no comando stop: {e}")
+            logger.error("Erro no comando stop: %s", e, exc_info=True)
             await ctx.send(f"❌ Erro ao parar música: {str(e)}")
 
     @commands.command(name='pause')
@@ -125,7 +246,7 @@ class Music(commands.Cog):
             await ctx.send("⏸️ Música pausada!")
 
         except Exception as e:
-            print(f"Erro no comando pause: {e}")
+            logger.error("Erro no comando pause: %s", e, exc_info=True)
             await ctx.send(f"❌ Erro ao pausar música: {str(e)}")
 
     @commands.command(name='resume')
@@ -145,7 +266,7 @@ class Music(commands.Cog):
             await ctx.send("▶️ Música retomada!")
 
         except Exception as e:
-            print(f"Erro no comando resume: {e}")
+            logger.error("Erro no comando resume: %s", e, exc_info=True)
             await ctx.send(f"❌ Erro ao retomar música: {str(e)}")
 
     @commands.command(name='skip')
@@ -177,101 +298,113 @@ class Music(commands.Cog):
                     await ctx.send("⏭️ Música pulada!")
                 return
 
-            # Inicia a votação
-            self.music.start_skip_vote(ctx.guild.id)
-            
             # Calcula votos necessários (metade + 1 dos usuários)
             required_votes = (total_users // 2) + 1
-            
-            # Cria mensagem de votação
+
+            # Cria mensagem de votação; os votos chegam pelos eventos de reação
             vote_msg = await ctx.send(
                 f"⏭️ Votação para pular música\n"
                 f"Reaja com ✅ para votar\n"
                 f"Votos necessários: {required_votes}/{total_users}"
             )
+            self.music.start_skip_vote(ctx.guild.id, vote_msg, required_votes)
+            # Expira em 30 segundos
+            self.vote_timers.schedule(ctx.guild.id, 30, lambda: self.expire_skip_vote(ctx.guild.id, vote_msg))
             await vote_msg.add_reaction("✅")
-            
-            # Espera 30 segundos pelos votos
-            def check(reaction, user):
-                return (
-                    str(reaction.emoji) == "✅" and
-                    not user.bot and
-                    user in ctx.author.voice.channel.members
-                )
-            
-            try:
-                while True:
-                    reaction, user = await self.bot.wait_for(
-                        'reaction_add',
-                        timeout=30.0,
-                        check=check
-                    )
-                    
-                    # Adiciona o voto
-                    current_votes = self.music.add_skip_vote(ctx.guild.id, user.id)
-                    
-                    # Atualiza mensagem com contagem
-                    await vote_msg.edit(content=(
-                        f"⏭️ Votação para pular música\n"
-                        f"Reaja com ✅ para votar\n"
-                        f"Votos: {current_votes}/{required_votes}"
-                    ))
-                    
-                    # Se atingiu os votos necessários, pula a música
-                    if current_votes >= required_votes:
-                        if await self.music.skip(voice_client, ctx.guild.id):
-                            await vote_msg.edit(content="⏭️ Música pulada!")
-                        break
-                    
-            except asyncio.TimeoutError:
-                await vote_msg.edit(content="❌ Tempo de votação expirado!")
-                self.music.end_skip_vote(ctx.guild.id)
-            
+
         except Exception as e:
-            print(f"Erro no comando skip: {e}")
+            logger.error("Erro no comando skip: %s", e, exc_info=True)
             await ctx.send(f"❌ Erro ao pular música: {str(e)}")
             self.music.end_skip_vote(ctx.guild.id)
+            self.vote_timers.cancel(ctx.guild.id)
+
+    def _skip_vote_for(self, payload):
+        """Retorna o player se a reação for um voto válido na votação em andamento"""
+        if payload.guild_id is None or str(payload.emoji) != "✅" or payload.user_id == self.bot.user.id:
+            return None
+        player = self.music.players.get(payload.guild_id)
+        if player is None or player.skip_message is None or player.skip_message.id != payload.message_id:
+            return None
+        return player
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        """Conta um voto de skip (só de quem está no canal de voz do bot)"""
+        player = self._skip_vote_for(payload)
+        if player is None or (payload.member is not None and payload.member.bot):
+            return
+        guild = self.bot.get_guild(payload.guild_id)
+        voice_client = guild.voice_client if guild else None
+        if not voice_client or payload.user_id not in voice_client.channel.voice_states:
+            return
+
+        votes = self.music.add_skip_vote(payload.guild_id, payload.user_id)
+        message = player.skip_message
+        if votes >= player.skip_required:
+            # Atingiu os votos necessários: pula a música
+            self.vote_timers.cancel(payload.guild_id)
+            if await self.music.skip(voice_client, payload.guild_id):
+                self.music.editor.edit(message, "⏭️ Música pulada!")
+            else:
+                self.music.end_skip_vote(payload.guild_id)
+            return
+        self.music.editor.edit(message, self.format_skip_vote(votes, player.skip_required))
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload):
+        """Desconta o voto de quem retirou a reação"""
+        player = self._skip_vote_for(payload)
+        if player is None or payload.user_id not in player.skip_votes:
+            return
+        votes = self.music.remove_skip_vote(payload.guild_id, payload.user_id)
+        self.music.editor.edit(player.skip_message, self.format_skip_vote(votes, player.skip_required))
+
+    @staticmethod
+    def format_skip_vote(votes, required):
+        return (
+            f"⏭️ Votação para pular música\n"
+            f"Reaja com ✅ para votar\n"
+            f"Votos: {votes}/{required}"
+        )
+
+    def expire_skip_vote(self, guild_id, message):
+        """Encerra a votação que não atingiu os votos a tempo"""
+        player = self.music.players.get(guild_id)
+        if player is not None and player.skip_message is message:
+            self.music.end_skip_vote(guild_id)
+            self.music.editor.edit(message, "❌ Tempo de votação expirado!")
 
     @commands.command(name='queue')
     async def queue(self, ctx):
-        """Mostra a fila de músicas"""
+        """Mostra a fila de músicas (uma página por vez)"""
         try:
             if not ctx.guild.voice_client:
                 await ctx.send("❌ Não estou tocando música no momento!")
                 return
 
-            queue_list = self.music.get_queue_list(ctx.guild.id)
-            if not queue_list:
+            page = self.music.get_queue_page(ctx.guild.id)
+            if not page['total']:
                 await ctx.send("📋 A fila está vazia!")
                 return
 
+            if page['pages'] == 1:
+                await self.send_and_delete(ctx, format_queue_page(page), True)
+                return
+
             # Apaga a mensagem do usuário
-            await ctx.message.delete()
-
-            # Divide a mensagem em chunks se necessário
-            chunks = [queue_list[i:i+1900] for i in range(0, len(queue_list), 1900)]
-            for i, chunk in enumerate(chunks):
-                # Adiciona o título apenas no primeiro chunk
-                if i == 0:
-                    message = await ctx.send(f"📋 **Fila de Músicas:**\n{chunk}")
-                else:
-                    message = await ctx.send(chunk)
-                
-                # Apaga a mensagem após 1 minuto
-                await asyncio.sleep(60)
-                try:
-                    await message.delete()
-                except:
-                    pass
+            try:
+                await ctx.message.delete()
+            except Exception as e:
+                logger.debug("Erro ao deletar comando: %s", e)
+
+            # Uma única mensagem; os botões trocam a página e ela é apagada após o timeout
+            view = QueueView(self.music, self.expiry, ctx.guild.id, page)
+            view.message = await ctx.send(format_queue_page(page), view=view)
+            self.expiry.schedule(view.message, view.timeout)
 
         except Exception as e:
-            print(f"Erro no comando queue: {e}")
-            error_msg = await ctx.send(f"❌ Erro ao mostrar fila: {str(e)}")
-            await asyncio.sleep(60)
-            try:
-                await error_msg.delete()
-            except:
-                pass
+            logger.error("Erro no comando queue: %s", e, exc_info=True)
+            await self.send_and_delete(ctx, f"❌ Erro ao mostrar fila: {str(e)}", False)
 
     @commands.command(name='now')
     async def now(self, ctx):
@@ -283,31 +416,44 @@ class Music(commands.Cog):
 
             current_song = self.music.get_current_song(ctx.guild.id)
             if current_song:
-                # Apaga a mensagem do usuário
-                await ctx.message.delete()
-                
-                # Envia a mensagem e a apaga após 1 minuto
-                message = await ctx.send(f"🎵 Tocando agora: **{current_song}**")
-                await asyncio.sleep(60)
-                try:
-                    await message.delete()
-                except:
-                    pass
+                await self.send_and_delete(ctx, f"🎵 Tocando agora: **{current_song}**", True)
             else:
                 await ctx.send("❌ Não consigo identificar a música atual!")
 
         except Exception as e:
-            print(f"Erro no comando now: {e}")
-            error_msg = await ctx.send(f"❌ Erro ao mostrar música atual: {str(e)}")
-            await asyncio.sleep(60)
-            try:
-                await error_msg.delete()
-            except:
-                pass
-
-@bot.event
-async def on_ready():
-    print(f'Ready to search the leylines!')
-    await bot.add_cog(Music(bot))
-
-bot.run(BOT_TOKEN) 
\ No newline at end of file
+            logger.error("Erro no comando now: %s", e, exc_info=True)
+            await self.send_and_delete(ctx, f"❌ Erro ao mostrar música atual: {str(e)}", False)
+
+def create_bot(shard_ids=None, shard_count=None):
+    """
+    Cria o bot com o cog de música.
+
+    Args:
+        shard_ids (list): Shards que este processo conecta (modo sharding)
+        shard_count (int): Total de shards do bot; se informado, usa AutoShardedBot
+    """
+    # Configuração do bot
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.voice_states = True
+
+    if shard_count is not None:
+        bot = commands.AutoShardedBot(
+            command_prefix='/', intents=intents, shard_ids=shard_ids, shard_count=shard_count
+        )
+    else:
+        bot = commands.Bot(command_prefix='/', intents=intents)
+
+    @bot.event
+    async def on_ready():
+        logger.info('Ready to search the leylines!')
+        # on_ready dispara de novo após reconexões: o cog (e o MusicManager) é criado uma vez
+        if bot.get_cog('Music') is None:
+            await bot.add_cog(Music(bot))
+
+    return bot
+
+if __name__ == "__main__":
+    setup_logging()
+    # log_handler=None: o discord.py usa o logging já configurado (com a fila)
+    create_bot().run(BOT_TOKEN, log_handler=None)
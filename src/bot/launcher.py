@@ -0,0 +1,164 @@
+"""
+Launcher de sharding: divide os shards do bot entre vários processos.
+Cada processo roda um AutoShardedBot com a sua faixa de shards (e o seu próprio
+MusicManager), então gateway, codificação de áudio e extrações usam vários núcleos.
+O launcher supervisiona os processos e reinicia os que caírem.
+"""
+import json
+import logging
+import multiprocessing
+import sys
+import os
+import time
+import urllib.request
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.config.settings import BOT_TOKEN, SHARDING_SETTINGS
+from src.utils.logger import setup_logging
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_URL = 'https://discord.com/api/v10/gateway/bot'
+
+
+def fetch_shard_count(token):
+    """Consulta no Discord a quantidade recomendada de shards"""
+    request = urllib.request.Request(GATEWAY_URL, headers={
+        'Authorization': f'Bot {token}',
+        'User-Agent': 'DiscordBot (amadeus, 1.0)'
+    })
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.load(response)
+    return data['shards']
+
+
+def split_shards(shard_count, processes):
+    """
+    Divide os shards em faixas contíguas, uma por processo.
+
+    Returns:
+        list: Lista de listas de IDs de shards (sem faixas vazias)
+    """
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def _run_worker(shard_ids, shard_count, start_delay):
+    """Ponto de entrada de um processo de shards"""
+    # Espera a vez de conectar: o Discord limita as conexões (identify) de shards
+    if start_delay:
+        time.sleep(start_delay)
+    setup_logging()
+    from src.bot.commands.music import create_bot
+    logger.info("Processo %s iniciando shards %s-%s de %s", os.getpid(), shard_ids[0], shard_ids[-1], shard_count)
+    create_bot(shard_ids=shard_ids, shard_count=shard_count).run(BOT_TOKEN, log_handler=None)
+
+
+class _Worker:
+    """Processo de uma faixa de shards e o estado de reinício dele"""
+    __slots__ = ('shard_ids', 'process', 'started_at', 'restart_delay', 'restart_at')
+
+    def __init__(self, shard_ids, restart_delay):
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started_at = 0
+        self.restart_delay = restart_delay
+        self.restart_at = None  # Quando reiniciar (None enquanto estiver rodando)
+
+
+class ShardLauncher:
+    """
+    Inicia e supervisiona os processos de shards.
+    Um processo que termina é reiniciado com espera exponencial; se ele ficou
+    estável por tempo suficiente, a espera volta ao valor inicial.
+    """
+
+    def __init__(self, token=BOT_TOKEN, settings=None):
+        settings = {**SHARDING_SETTINGS, **(settings or {})}
+        self.token = token
+        self.shard_count = settings['shard_count']
+        self.processes = settings['processes']
+        self.identify_interval = settings['identify_interval']
+        self.restart_delay = settings['restart_delay']
+        self.max_restart_delay = settings['max_restart_delay']
+        self.stable_after = settings['stable_after']
+        # spawn funciona igual no Windows e no Linux (o bot usa threads)
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = []
+
+    def _start(self, worker, start_delay=0):
+        """Inicia (ou reinicia) o processo de um worker"""
+        worker.process = self._context.Process(
+            target=_run_worker,
+            args=(worker.shard_ids, self.shard_count, start_delay),
+            name=f"shards-{worker.shard_ids[0]}-{worker.shard_ids[-1]}"
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic() + start_delay
+        worker.restart_at = None
+
+    def _supervise(self):
+        """Reinicia os processos que terminaram (roda até Ctrl+C)"""
+        while True:
+            now = time.monotonic()
+            for worker in self._workers:
+                if worker.restart_at is not None:
+                    if now >= worker.restart_at:
+                        logger.info("Reiniciando %s", worker.process.name)
+                        self._start(worker)
+                    continue
+                if worker.process.is_alive():
+                    continue
+
+                # Processo caiu: agenda o reinício com espera exponencial
+                if now - worker.started_at >= self.stable_after:
+                    worker.restart_delay = self.restart_delay
+                logger.error("%s terminou (código %s), reiniciando em %ss",
+                             worker.process.name, worker.process.exitcode, worker.restart_delay)
+                worker.restart_at = now + worker.restart_delay
+                worker.restart_delay = min(worker.restart_delay * 2, self.max_restart_delay)
+            time.sleep(1)
+
+    def stop(self):
+        """Encerra todos os processos de shards"""
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(timeout=10)
+
+    def run(self):
+        """Divide os shards, inicia os processos e os supervisiona"""
+        if self.shard_count is None:
+            self.shard_count = fetch_shard_count(self.token)
+        ranges = split_shards(self.shard_count, self.processes)
+        logger.info("%s shards em %s processos", self.shard_count, len(ranges))
+
+        self._workers = [_Worker(shard_ids, self.restart_delay) for shard_ids in ranges]
+        # Escalona a conexão dos processos: cada shard conecta um de cada vez
+        start_delay = 0
+        for worker in self._workers:
+            self._start(worker, start_delay)
+            start_delay += len(worker.shard_ids) * self.identify_interval
+
+        try:
+            self._supervise()
+        except KeyboardInterrupt:
+            logger.info("Encerrando processos de shards...")
+        finally:
+            self.stop()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    ShardLauncher().run()
@@ -22,12 +22,75 @@ if not BOT_TOKEN:
 # Configurações do FFmpeg
 FFMPEG_PATH = get_ffmpeg_path()
 
+# Validação das URLs antes de tocar (desligada: confia no formato informado pelo yt-dlp)
+FFMPEG_SETTINGS = {
+    'probe_urls': False,  # Faz um teste rápido e assíncrono da URL antes de tocar
+    'probe_timeout': 3    # Tempo máximo do teste (segundos)
+}
+
+# Configurações do cache local de áudio (músicas mais tocadas)
+AUDIO_CACHE_SETTINGS = {
+    'enabled': False,                      # Opt-in: baixa o áudio das músicas populares
+    'path': get_resource_path("data/audio"),
+    'max_bytes': 2 * 1024 ** 3,            # Limite de espaço em disco (2 GB)
+    'min_plays': 3,                        # Reproduções necessárias para salvar a música
+    'download_workers': 1,                 # Downloads simultâneos em segundo plano
+    'flush_interval': 5                    # Segundos entre gravações das contagens no índice
+}
+
+# Configurações da reprodução
+PLAYBACK_SETTINGS = {
+    'gapless': True,          # Inicia o FFmpeg da próxima música antes da atual acabar
+    'preload_seconds': 5,     # Quanto tempo antes do fim a próxima música é iniciada
+    'prebuffer_frames': 50,   # Frames (20ms cada) lidos antecipadamente da próxima música
+    'crossfade': 0,           # Duração do crossfade em segundos (0 desliga)
+    'opus_passthrough': True, # Streams Opus são copiados (-c:a copy, sem libopus); os demais viram Opus
+    'opus_bitrate': 128,      # Bitrate (kbps) quando a fonte não é Opus e precisa ser convertida
+    'resume_attempts': 3,     # Retomadas da mesma música após o stream cair (0 desliga)
+    'resume_delay': 1,        # Espera (segundos) antes de retomar, dobrando a cada tentativa
+    'resume_tolerance': 5     # Fim do stream a menos disso (segundos) do fim da música é normal
+}
+
+# Normalização de volume (loudness medida uma vez por vídeo e salva no cache de metadados)
+LOUDNESS_SETTINGS = {
+    'enabled': False,          # Opt-in: mede a loudness das músicas em segundo plano
+    'target': -14.0,           # Loudness integrada desejada (LUFS)
+    'min_gain': 1.0,           # Ganhos menores que isso (dB) não são aplicados
+    'max_gain': 12.0,          # Limite do ganho aplicado, para cima ou para baixo (dB)
+    'max_seconds': 600,        # Trecho analisado no máximo (músicas longas/lives)
+    'concurrency': 1,          # Análises simultâneas (cada uma é um FFmpeg decodificando)
+    'timeout': 120,            # Tempo máximo de uma análise (segundos)
+    'transcode_passthrough': False  # Recodifica streams Opus (passthrough) para aplicar o ganho
+}
+
+# Transmissão compartilhada: servidores tocando a mesma música usam um único FFmpeg
+BROADCAST_SETTINGS = {
+    'enabled': False,        # Opt-in: útil quando muitos servidores tocam as mesmas músicas
+    'buffer_seconds': 10     # Atraso máximo entre servidores na mesma transmissão (e pausa tolerada)
+}
+
+# Formato preferido no modo Opus passthrough (WebM/Opus do YouTube, com fallback)
+OPUS_FORMAT = 'bestaudio[acodec=opus]/bestaudio/best'
+
 # Configurações do arquivo de cookies
 COOKIES_PATH = get_resource_path("src/config/cookies.txt")
 
 # Configurações do bot
 COMMAND_PREFIX = "!"  # Prefixo para comandos do bot
 
+IDLE_TIMEOUT = 180  # Segundos com o canal de voz vazio até desconectar (3 minutos)
+
+# Configurações de sharding (vários processos, cada um com parte dos shards)
+SHARDING_SETTINGS = {
+    'enabled': False,
+    'shard_count': None,         # None para usar a quantidade recomendada pelo Discord
+    'processes': os.cpu_count() or 1,  # Processos de shards (limitado ao número de shards)
+    'identify_interval': 5,      # Segundos entre conexões de shards (limite do Discord)
+    'restart_delay': 5,          # Espera inicial antes de reiniciar um processo que caiu
+    'max_restart_delay': 300,    # Espera máxima (dobra a cada queda seguida)
+    'stable_after': 600          # Processo rodando há esse tempo zera a espera de reinício
+}
+
 # Configurações do YouTube
 YTDL_OPTIONS = {
     'format': 'bestaudio/best',
@@ -41,8 +104,105 @@ YTDL_OPTIONS = {
     'cookiefile': COOKIES_PATH
 }
 
+# Configurações da extração (yt-dlp roda fora do event loop)
+EXTRACTION_SETTINGS = {
+    'executor': 'thread',   # 'thread' ou 'process'
+    'max_workers': 4,       # Número de workers do pool
+    'global_limit': 4,      # Extrações simultâneas no total
+    'per_guild_limit': 1,   # Extrações simultâneas por servidor
+    'batch_limit': 3,       # Extrações simultâneas por servidor ao adicionar várias músicas de uma vez
+    'timeout': 30           # Tempo máximo de uma extração (segundos)
+}
+
+# Configurações de playlists (entradas listadas aos poucos e resolvidas perto de tocar)
+PLAYLIST_SETTINGS = {
+    'enabled': True,
+    'max_entries': 500   # Máximo de músicas adicionadas por playlist
+}
+
+# Adição de várias músicas de uma vez (separadas por linha ou ";", ou em um arquivo .txt)
+BULK_SETTINGS = {
+    'max_entries': 50,           # Máximo de músicas por comando
+    'max_file_bytes': 64 * 1024  # Tamanho máximo do arquivo anexado
+}
+
+# Configurações do cache de buscas/metadados
+CACHE_SETTINGS = {
+    'enabled': True,
+    'path': get_resource_path("data/cache.sqlite3"),  # None para usar só memória
+    'memory_size': 2048,             # Máximo de itens no LRU em memória
+    'metadata_ttl': 7 * 24 * 3600,   # Título/ID: 7 dias
+    'stream_url_ttl': 4 * 3600,      # Validade da URL do stream quando ela não traz o expire
+    'stream_url_margin': 300,        # Folga exigida da URL além do fim da música
+    'flush_interval': 5              # Segundos entre gravações do cache no banco
+}
+
+# Configurações do snapshot das filas (retomada rápida após reiniciar)
+SNAPSHOT_SETTINGS = {
+    'enabled': True,
+    'path': get_resource_path("data/snapshot.sqlite3"),
+    'interval': 5,          # Segundos entre checkpoints (só grava o que mudou)
+    'max_age': 24 * 3600    # Filas mais antigas que isso não são retomadas
+}
+
+# Configurações das métricas (formato Prometheus em http://host:porta/metrics)
+METRICS_SETTINGS = {
+    'enabled': False,
+    'host': '127.0.0.1',
+    'port': 9108,                 # Com sharding, cada processo usa porta + primeiro shard
+    'loop_lag_interval': 0.5,     # Intervalo da medição de atraso do event loop
+    'per_guild_queue_depth': True # Uma série por servidor (desative com muitos servidores)
+}
+
+# Detector de travamentos do event loop (thread que captura a pilha do loop)
+WATCHDOG_SETTINGS = {
+    'enabled': False,
+    'threshold': 0.25,   # Segundos sem o loop responder para contar como travamento
+    'interval': 0.05,    # Intervalo do batimento e da verificação
+    'stack_limit': 20    # Frames da pilha incluídos no log
+}
+
+# Configurações de log (escrito por uma thread separada, fora do event loop)
+LOGGING_SETTINGS = {
+    'level': 'INFO',      # Nível padrão: DEBUG mostra cada passo da reprodução
+    'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    'datefmt': '%Y-%m-%d %H:%M:%S',
+    'file': None,         # Ex.: get_resource_path("data/bot.log") para também gravar em arquivo
+    'file_max_bytes': 10 * 1024 ** 2,
+    'file_backups': 3,
+    'levels': {           # Níveis por módulo (sobrescrevem o padrão)
+        'discord': 'INFO',
+        'discord.gateway': 'WARNING',
+        'src.core.audio_manager': 'INFO',
+        'src.core.extractor': 'INFO'
+    }
+}
+
+# Exibição da fila (/queue): uma mensagem com páginas e botões de navegação
+QUEUE_PAGE_SETTINGS = {
+    'page_size': 15,   # Músicas por página
+    'max_title': 80,   # Títulos maiores são cortados
+    'timeout': 120     # Segundos sem interação até a mensagem ser apagada
+}
+
 # Configurações de mensagens
 MESSAGE_DELETE_TIMES = {
     'success': 60,  # 1 minuto
     'error': 180    # 3 minutos
+}
+
+# Edições de mensagens (votação de skip, "tocando agora"): só o conteúdo mais recente é enviado
+MESSAGE_EDIT_SETTINGS = {
+    'interval': 1.5,     # Mínimo de segundos entre duas edições da mesma mensagem
+    'concurrency': 4,    # Edições enviadas ao mesmo tempo
+    'retry_delay': 5     # Espera após um rate limit
+}
+
+# Remoção das mensagens temporárias (um agendador para todas, com bulk delete por canal)
+MESSAGE_EXPIRY_SETTINGS = {
+    'path': get_resource_path("data/expiry.sqlite3"),  # Pendentes sobrevivem a reinícios (None desativa)
+    'batch_window': 5,       # Mensagens que vencem em até N segundos são apagadas no mesmo lote
+    'concurrency': 2,        # Canais sendo limpos ao mesmo tempo
+    'retry_delay': 30,       # Espera após um rate limit antes de tentar de novo
+    'persist_interval': 5    # Segundos entre gravações no banco
 } 
\ No newline at end of file
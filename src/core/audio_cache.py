@@ -0,0 +1,351 @@
+"""
+Cache local de áudio para as músicas mais tocadas.
+Depois de N reproduções, o áudio é baixado em segundo plano para um diretório
+endereçado por conteúdo (nome do arquivo = SHA-256), com limite de bytes e
+remoção LRU. O play_next passa a tocar direto do arquivo local; o hash de cada
+arquivo é conferido de novo na primeira vez que ele é usado após reiniciar.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import yt_dlp
+from ..config.settings import AUDIO_CACHE_SETTINGS
+from .cache import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def _file_sha256(path):
+    """Calcula o SHA-256 de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _download_audio(ytdl_opts, url, tmp_dir):
+    """
+    Baixa o áudio com o yt-dlp para um diretório temporário (roda fora do event loop).
+
+    Returns:
+        tuple: (caminho do arquivo baixado, codec do áudio)
+    """
+    opts = {
+        **ytdl_opts,
+        'outtmpl': os.path.join(tmp_dir, '%(id)s.%(ext)s'),
+        'noplaylist': True,
+        'quiet': True,
+        'noprogress': True
+    }
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        return ydl.prepare_filename(info), info.get('acodec')
+
+
+class AudioCache:
+    """
+    Cache em disco de áudio das músicas populares (opt-in).
+    Os arquivos são escritos em um diretório temporário e movidos de forma
+    atômica para o nome final, então leitores nunca veem um arquivo parcial.
+
+    O índice, as contagens de reprodução e o último uso ficam em memória:
+    lookup()/record_play() rodam no event loop e não tocam no banco. As
+    alterações são gravadas em lote, em uma thread própria, a cada
+    `flush_interval` segundos (como no QueueSnapshot).
+    """
+
+    def __init__(self, ytdl_opts, settings=None, on_store=None):
+        settings = {**AUDIO_CACHE_SETTINGS, **(settings or {})}
+        self.enabled = settings['enabled']
+        self.max_bytes = settings['max_bytes']
+        self.min_plays = settings['min_plays']
+        self.flush_interval = settings['flush_interval']
+        self.ytdl_opts = ytdl_opts
+        self.on_store = on_store  # Chamado no event loop com (video_id, caminho) após salvar
+
+        # O lock só protege os dicionários em memória (nunca é mantido durante I/O)
+        self._lock = threading.Lock()
+        self._files = {}           # video_id -> [filename, size, codec, last_used]
+        self._plays = {}           # video_id -> reproduções
+        self._dirty_plays = set()  # Contagens ainda não gravadas
+        self._dirty_used = set()   # Últimos usos ainda não gravados
+        self._verified = set()     # Arquivos com o SHA-256 conferido neste processo
+        self._downloading = set()  # video_ids sendo baixados agora
+        self._task = None
+        self._db = None
+        if not self.enabled:
+            return
+
+        self.path = Path(settings['path'])
+        self.tmp_path = self.path / 'tmp'
+        self.tmp_path.mkdir(parents=True, exist_ok=True)
+        # Restos de downloads interrompidos (só os antigos: com sharding, outros
+        # processos podem estar baixando no mesmo diretório agora)
+        for leftover in self.tmp_path.iterdir():
+            try:
+                if time.time() - leftover.stat().st_mtime > 6 * 3600:
+                    shutil.rmtree(leftover, ignore_errors=True)
+            except OSError:
+                pass
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings['download_workers'],
+            thread_name_prefix='audio-cache'
+        )
+        # Uma única thread escreve no banco e confere os hashes
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio-cache-io')
+        self._db = sqlite3.connect(str(self.path / 'index.sqlite3'), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                video_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                codec TEXT,
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS plays (
+                video_id TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
+        ''')
+        self._db.commit()
+        for video_id, filename, size, codec, last_used in self._db.execute(
+            'SELECT video_id, filename, size, codec, last_used FROM files'
+        ):
+            self._files[video_id] = [filename, size, codec, last_used]
+        self._plays = dict(self._db.execute('SELECT video_id, count FROM plays'))
+
+    def start(self):
+        """Inicia a gravação periódica das contagens e dos últimos usos (no primeiro record_play)"""
+        if self._db is not None and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Erro ao salvar o índice do cache de áudio: %s", e)
+
+    async def flush(self):
+        """Grava em lote as contagens e os últimos usos alterados"""
+        if self._db is None:
+            return
+        plays, used = self._take_dirty()
+        if plays or used:
+            await asyncio.get_running_loop().run_in_executor(self.writer, self._write_usage, plays, used)
+
+    def _take_dirty(self):
+        with self._lock:
+            plays = [(video_id, self._plays[video_id]) for video_id in self._dirty_plays]
+            used = [(self._files[video_id][3], video_id) for video_id in self._dirty_used
+                    if video_id in self._files]
+            self._dirty_plays.clear()
+            self._dirty_used.clear()
+        return plays, used
+
+    def _write_usage(self, plays, used):
+        """Aplica as contagens e os últimos usos no banco (roda na thread de escrita)"""
+        self._db.executemany('INSERT OR REPLACE INTO plays (video_id, count) VALUES (?, ?)', plays)
+        self._db.executemany('UPDATE files SET last_used = ? WHERE video_id = ?', used)
+        self._db.commit()
+
+    def lookup(self, video_id):
+        """
+        Retorna o arquivo local de uma música, se existir e estiver íntegro.
+        Na primeira vez que o arquivo é usado no processo, o SHA-256 é conferido
+        em segundo plano; se não bater com o nome, a entrada é descartada.
+
+        Returns:
+            tuple: (caminho, codec) ou None
+        """
+        if not self.enabled or not video_id:
+            return None
+        with self._lock:
+            entry = self._files.get(video_id)
+        if entry is None:
+            CACHE_REQUESTS.inc(cache='audio', result='miss')
+            return None
+        filename, size, codec, _ = entry
+        path = self.path / filename
+        try:
+            valid = path.stat().st_size == size
+        except OSError:
+            valid = False
+        if not valid:
+            # Arquivo sumiu ou foi truncado: descarta a entrada
+            logger.debug("Arquivo do cache de áudio inválido: %s", filename)
+            self._discard(video_id, filename)
+            CACHE_REQUESTS.inc(cache='audio', result='miss')
+            return None
+        CACHE_REQUESTS.inc(cache='audio', result='hit')
+        with self._lock:
+            entry[3] = time.time()
+            self._dirty_used.add(video_id)
+            verify = video_id not in self._verified
+            self._verified.add(video_id)
+        if verify:
+            self.writer.submit(self._verify, video_id, filename)
+        return str(path), codec
+
+    def _verify(self, video_id, filename):
+        """Confere o SHA-256 do arquivo com o nome dele (roda na thread de escrita)"""
+        try:
+            digest = _file_sha256(self.path / filename)
+        except OSError:
+            return
+        if digest != Path(filename).stem:
+            logger.warning("Arquivo corrompido no cache de áudio, descartando: %s", filename)
+            CACHE_REQUESTS.inc(cache='audio', result='corrupt')
+            self._discard(video_id, filename)
+
+    def contains(self, video_id):
+        """Verifica (sem validar o arquivo) se a música está no cache"""
+        if not self.enabled or not video_id:
+            return False
+        with self._lock:
+            return video_id in self._files
+
+    def codec(self, video_id):
+        """Codec do arquivo salvo de uma música (None se ela não estiver no cache)"""
+        if not self.enabled or not video_id:
+            return None
+        with self._lock:
+            entry = self._files.get(video_id)
+        return entry[2] if entry else None
+
+    def record_play(self, song):
+        """
+        Conta uma reprodução e agenda o download quando a música fica popular.
+
+        Args:
+            song (Track): Música da fila (precisa de id e webpage_url)
+        """
+        video_id = song.id
+        if not self.enabled or not video_id:
+            return
+        self.start()
+        with self._lock:
+            count = self._plays.get(video_id, 0) + 1
+            self._plays[video_id] = count
+            self._dirty_plays.add(video_id)
+            if video_id in self._files or count < self.min_plays or video_id in self._downloading:
+                return
+            self._downloading.add(video_id)
+        asyncio.get_running_loop().create_task(self._fill(video_id, song.webpage_url))
+
+    async def _fill(self, video_id, url):
+        """Baixa uma música para o cache em segundo plano"""
+        try:
+            path = await asyncio.get_running_loop().run_in_executor(self.executor, self._store, video_id, url)
+            if path and self.on_store:
+                self.on_store(video_id, path)
+        except Exception as e:
+            logger.warning("Erro ao salvar música no cache de áudio: %s", e)
+        finally:
+            with self._lock:
+                self._downloading.discard(video_id)
+
+    def _store(self, video_id, url):
+        """
+        Baixa, verifica e move o arquivo para o cache (roda no pool de downloads).
+
+        Returns:
+            str: Caminho do arquivo salvo, ou None se foi descartado
+        """
+        tmp_dir = tempfile.mkdtemp(dir=self.tmp_path)
+        try:
+            downloaded, codec = _download_audio(self.ytdl_opts, url, tmp_dir)
+            size = os.path.getsize(downloaded)
+            if size <= 0 or size > self.max_bytes:
+                return None
+            # Endereçado por conteúdo: o nome é o hash do próprio arquivo
+            digest = _file_sha256(downloaded)
+            filename = digest + Path(downloaded).suffix
+            os.replace(downloaded, self.path / filename)
+
+            now = time.time()
+            with self._lock:
+                self._files[video_id] = [filename, size, codec, now]
+                self._verified.add(video_id)  # Acabou de ser calculado
+                victims = self._pick_victims()
+            self.writer.submit(self._write_file, video_id, filename, size, codec, now)
+            # Os arquivos são apagados fora do lock: o event loop não espera o disco
+            for victim_id, victim_filename in victims:
+                self._discard(victim_id, victim_filename)
+            logger.info("Música salva no cache de áudio: %s (%s bytes)", video_id, size)
+            return str(self.path / filename)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _write_file(self, video_id, filename, size, codec, last_used):
+        self._db.execute(
+            'INSERT OR REPLACE INTO files (video_id, filename, size, codec, last_used) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (video_id, filename, size, codec, last_used)
+        )
+        self._db.commit()
+
+    def _pick_victims(self):
+        """Escolhe as músicas menos usadas até caber no limite (chamado com o lock)"""
+        total = sum(entry[1] for entry in self._files.values())
+        victims = []
+        for video_id, entry in sorted(self._files.items(), key=lambda item: item[1][3]):
+            if total <= self.max_bytes:
+                break
+            victims.append((video_id, entry[0]))
+            total -= entry[1]
+        return victims
+
+    def _discard(self, video_id, filename):
+        """
+        Remove uma entrada do índice e o arquivo (se nenhuma outra entrada o usa).
+        Se o arquivo não puder ser apagado (ex.: no Windows enquanto o FFmpeg
+        toca), a entrada continua no índice para uma nova tentativa depois.
+        """
+        with self._lock:
+            entry = self._files.get(video_id)
+            if entry is None or entry[0] != filename:
+                return
+            del self._files[video_id]
+            self._dirty_used.discard(video_id)
+            self._verified.discard(video_id)
+            shared = any(other[0] == filename for other in self._files.values())
+        if not shared:
+            try:
+                (self.path / filename).unlink(missing_ok=True)
+            except OSError:
+                with self._lock:
+                    self._files.setdefault(video_id, entry)
+                return
+        if self._db is not None:
+            self.writer.submit(self._write_removal, video_id)
+
+    def _write_removal(self, video_id):
+        self._db.execute('DELETE FROM files WHERE video_id = ?', (video_id,))
+        self._db.commit()
+
+    def close(self):
+        """Encerra os downloads, grava o que falta e fecha o índice"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._db is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            plays, used = self._take_dirty()
+            self.writer.submit(self._write_usage, plays, used)
+            self.writer.shutdown(wait=True)
+            self._db.close()
+            self._db = None
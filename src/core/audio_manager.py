@@ -1,16 +1,56 @@
 import discord
 from discord.ext import commands
 import asyncio
+import logging
 import yt_dlp
-import subprocess
 import os
-from collections import deque
 import time
-from ..utils.functions import get_ffmpeg_path, get_resource_path
-from ..config.settings import YTDL_OPTIONS, COOKIES_PATH
+from ..utils.functions import get_ffmpeg_path, get_ffmpeg_info, get_resource_path
+from ..utils.scheduler import TimerHeap
+from ..utils.edits import MessageEditor
+from ..utils.metrics import REGISTRY, Counter, Gauge, Histogram
+from ..config.settings import (
+    YTDL_OPTIONS, COOKIES_PATH, FFMPEG_SETTINGS, PLAYBACK_SETTINGS, OPUS_FORMAT, PLAYLIST_SETTINGS,
+    IDLE_TIMEOUT, METRICS_SETTINGS, BULK_SETTINGS, QUEUE_PAGE_SETTINGS, BROADCAST_SETTINGS
+)
+from .extractor import AudioExtractor, ExtractionCancelled, is_playlist_url
+from .cache import MetadataCache
+from .audio_cache import AudioCache
+from .loudness import LoudnessAnalyzer
+from .broadcast import BroadcastHub
+from .sources import GaplessAudioSource, CountingAudioSource, FRAME_MS
+from .player import GuildPlayer, Track
+from .snapshot import QueueSnapshot
 import certifi
 import ssl
 
+logger = logging.getLogger(__name__)
+
+FFMPEG_SPAWN_SECONDS = Histogram(
+    'amadeus_ffmpeg_spawn_seconds', 'Tempo para iniciar o FFmpeg de uma música', labels=('source',),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+TRANSITION_GAP_SECONDS = Histogram(
+    'amadeus_transition_gap_seconds', 'Silêncio entre o fim de uma música e o início da próxima (play_next)'
+)
+GAPLESS_SWITCHES = Counter('amadeus_gapless_switches_total', 'Trocas de música sem pausa (gapless)')
+TRACKS_STARTED = Counter('amadeus_tracks_started_total', 'Músicas iniciadas')
+RESUMES = Counter('amadeus_track_resumes_total', 'Músicas retomadas na posição após o stream cair')
+QUEUE_DEPTH = Gauge('amadeus_queue_depth', 'Músicas na fila por servidor', labels=('guild',))
+QUEUED_TRACKS = Gauge('amadeus_queued_tracks', 'Músicas em todas as filas')
+ACTIVE_PLAYERS = Gauge('amadeus_active_players', 'Servidores com estado de reprodução')
+VOICE_CLIENTS = Gauge('amadeus_voice_clients', 'Conexões de voz ativas')
+CACHE_HIT_RATIO = Gauge('amadeus_metadata_cache_hit_ratio', 'Taxa de acerto do cache de metadados')
+
+
+class SongNotFound(Exception):
+    """A busca não encontrou nenhuma música tocável (a mensagem é mostrada ao usuário)"""
+
+
+class StreamUnavailable(Exception):
+    """A música saiu do cache de áudio e não tem uma URL de stream válida"""
+
+
 class MusicManager:
     """
     Classe responsável por gerenciar a reprodução de música no Discord.
@@ -19,22 +59,18 @@ class MusicManager:
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.queues = {}
-        self.text_channels = {}
-        self.current_songs = {}
-        self.skip_votes = {}  # Armazena os votos de skip por servidor
-        self.skip_in_progress = {}  # Controla se há uma votação em andamento
-        self.last_user_check = {}  # Armazena o último momento em que havia usuários
+        self.players = {}  # guild_id -> GuildPlayer (descartado ao sair do canal de voz)
+        self.idle_timers = TimerHeap()  # Timers de inatividade por servidor (um único heap)
         
-        # Configura o caminho do FFmpeg
+        # Configura o caminho do FFmpeg e detecta seus recursos (uma única vez)
         self.ffmpeg_path = get_ffmpeg_path()
-        
-        # Inicia a task de verificação de usuários
-        self.bot.loop.create_task(self.check_empty_channels())
+        self.ffmpeg_info = get_ffmpeg_info(str(self.ffmpeg_path))
+        if self.ffmpeg_info:
+            logger.info("FFmpeg versão: %s", self.ffmpeg_info['version'])
         
         # Configura o caminho do arquivo de cookies
         self.cookies_path = COOKIES_PATH
-        print(f"[DEBUG] Caminho do cookies.txt: {self.cookies_path}")
+        logger.debug("Caminho do cookies.txt: %s", self.cookies_path)
         
         # Configura o certificado SSL
         os.environ['SSL_CERT_FILE'] = certifi.where()
@@ -42,50 +78,113 @@ class MusicManager:
         # Configurações do yt-dlp
         self.ytdl_opts = YTDL_OPTIONS.copy()
 
-    async def check_empty_channels(self):
-        """Verifica periodicamente se há canais vazios e desconecta o bot"""
-        while True:
-            try:
-                # Obtém todos os voice clients ativos
-                voice_clients = [vc for vc in self.bot.voice_clients if vc and vc.is_connected()]
-                
-                for voice_client in voice_clients:
-                    guild_id = voice_client.guild.id
-                    current_time = time.time()  # Define current_time aqui
-                    
-                    # Conta apenas usuários reais (não bots) no canal
-                    real_users = [m for m in voice_client.channel.members if not m.bot]
-                    
-                    if not real_users:
-                        # Se não houver usuários, verifica se já passou 3 minutos
-                        last_check = self.last_user_check.get(guild_id, current_time)
-                        
-                        if current_time - last_check >= 180:  # 3 minutos = 180 segundos
-                            print(f"[DEBUG] Desconectando do canal vazio em {guild_id}")
-                            # Limpa a fila e o estado
-                            if guild_id in self.queues:
-                                self.queues[guild_id].clear()
-                            self.end_skip_vote(guild_id)
-                            # Desconecta o bot
-                            await voice_client.disconnect()
-                            # Envia mensagem no canal de texto se disponível
-                            if guild_id in self.text_channels:
-                                try:
-                                    await self.text_channels[guild_id].send(
-                                        "👋 Desconectei do canal de voz por inatividade."
-                                    )
-                                except:
-                                    pass
-                    else:
-                        # Se houver usuários, reseta o último check
-                        self.last_user_check[guild_id] = current_time
-                
-                # Espera 30 segundos antes da próxima verificação
-                await asyncio.sleep(30)
-                
-            except Exception as e:
-                print(f"[ERRO] Erro ao verificar canais vazios: {e}")
-                await asyncio.sleep(30)  # Espera 30 segundos mesmo em caso de erro
+        # Configurações do FFmpeg para evitar cortes
+        self.ffmpeg_options = {
+            'options': '-vn -b:a 192k -ar 48000 -ac 2 -loglevel error',
+            'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+        }
+        # No passthrough o FFmpeg só remuxa o Opus (sem decodificar para PCM)
+        self.opus_options = {
+            'options': '-vn -loglevel error',
+            'before_options': self.ffmpeg_options['before_options']
+        }
+        if PLAYBACK_SETTINGS['opus_passthrough']:
+            self.ytdl_opts['format'] = OPUS_FORMAT
+
+        # Extração assíncrona (yt-dlp roda em um pool, fora do event loop)
+        self.extractor = AudioExtractor()
+
+        # Cache de buscas/metadados (memória + SQLite)
+        self.cache = MetadataCache()
+
+        # Cache local de áudio das músicas mais tocadas (opt-in)
+        self.audio_cache = AudioCache(self.ytdl_opts, on_store=self._on_audio_cached)
+
+        # Normalização de volume: loudness medida uma vez por vídeo (opt-in)
+        self.loudness = LoudnessAnalyzer(self.ffmpeg_path, self.cache)
+        if self.loudness.enabled and not self.gain_applies('opus'):
+            logger.warning(
+                "Normalização de volume ativa, mas streams Opus são copiados no passthrough e "
+                "ficam sem o ganho; ative LOUDNESS_SETTINGS['transcode_passthrough'] (requer libopus)"
+            )
+
+        # Um FFmpeg por música/posição compartilhado entre servidores (opt-in)
+        self.broadcasts = None
+        if BROADCAST_SETTINGS['enabled']:
+            self.broadcasts = BroadcastHub(BROADCAST_SETTINGS['buffer_seconds'])
+
+        # Edições de mensagens com debounce (votação de skip, "tocando agora")
+        self.editor = MessageEditor()
+
+        # Snapshot das filas para retomar após reiniciar (carregado em restore_sessions)
+        self.snapshot = QueueSnapshot()
+        self.saved_sessions = {}
+
+        # Gauges calculados a cada leitura de /metrics
+        REGISTRY.add_collector('music', self._collect_metrics)
+
+    def handle_voice_state_update(self, member, before, after):
+        """
+        Arma/cancela o timer de inatividade a partir dos eventos de voz.
+        O timer é armado quando o último usuário sai do canal do bot e
+        cancelado quando alguém entra, então o custo depende só dos eventos.
+        """
+        voice_client = member.guild.voice_client
+        guild_id = member.guild.id
+        is_bot_itself = self.bot.user is not None and member.id == self.bot.user.id
+        if is_bot_itself and after.channel is None:
+            # O próprio bot saiu do canal de voz: descarta o estado do servidor
+            self.destroy_player(guild_id)
+            return
+        if not voice_client or not voice_client.is_connected():
+            self.idle_timers.cancel(guild_id)
+            return
+
+        channel = voice_client.channel
+        if not is_bot_itself and before.channel != channel and after.channel != channel:
+            return
+        self.check_idle(voice_client)
+
+    def check_idle(self, voice_client):
+        """Arma o timer se não houver usuários no canal do bot, ou cancela se houver"""
+        guild_id = voice_client.guild.id
+        if any(not m.bot for m in voice_client.channel.members):
+            if self.idle_timers.cancel(guild_id):
+                logger.debug("Usuário voltou, timer de inatividade cancelado em %s", guild_id)
+            return
+        if guild_id not in self.idle_timers:
+            logger.debug("Canal vazio em %s, desconectando em %ss", guild_id, IDLE_TIMEOUT)
+            self.idle_timers.schedule(guild_id, IDLE_TIMEOUT, lambda: self._idle_disconnect(guild_id))
+
+    async def _idle_disconnect(self, guild_id):
+        """Desconecta o bot de um canal que ficou vazio"""
+        try:
+            guild = self.bot.get_guild(guild_id)
+            voice_client = guild.voice_client if guild else None
+            if not voice_client or not voice_client.is_connected():
+                return
+            # Confere de novo: alguém pode ter entrado sem gerar evento para este canal
+            if any(not m.bot for m in voice_client.channel.members):
+                return
+
+            logger.info("Desconectando do canal vazio em %s", guild_id)
+            player = self.players.get(guild_id)
+            text_channel = player.text_channel if player else None
+            # Limpa a fila e o estado
+            await self.stop(voice_client, guild_id)
+            self.destroy_player(guild_id)
+            # Desconecta o bot
+            await voice_client.disconnect()
+            # Envia mensagem no canal de texto se disponível
+            if text_channel:
+                try:
+                    await text_channel.send(
+                        "👋 Desconectei do canal de voz por inatividade."
+                    )
+                except:
+                    pass
+        except Exception as e:
+            logger.error("Erro ao desconectar de canal vazio: %s", e)
 
     async def join_voice(self, channel):
         """Conecta ao canal de voz"""
@@ -101,110 +200,468 @@ class MusicManager:
             return await channel.connect()
             
         except Exception as e:
-            print(f"[ERRO] Erro ao conectar ao canal de voz: {e}")
+            logger.error("Erro ao conectar ao canal de voz: %s", e)
             return None
 
+    def get_player(self, guild_id, text_channel=None):
+        """
+        Retorna o GuildPlayer do servidor, criando-o se necessário.
+        Se houver uma fila salva antes do último reinício, ela é restaurada aqui.
+        """
+        player = self.players.get(guild_id)
+        if player is None:
+            player = self.players[guild_id] = GuildPlayer(guild_id, text_channel)
+            saved = self.saved_sessions.pop(guild_id, None)
+            if saved is not None:
+                self._restore_player(player, saved)
+        return player
+
+    def _restore_player(self, player, saved):
+        """Preenche o player com a fila salva no snapshot"""
+        try:
+            player.queue.extend(saved.tracks())
+        except Exception as e:
+            logger.error("Erro ao restaurar a fila do servidor %s: %s", player.guild_id, e)
+            return
+        if player.text_channel is None and saved.text_channel_id:
+            player.text_channel = self.bot.get_channel(saved.text_channel_id)
+        player.resume_at = saved.position
+        self.snapshot.mark(player.guild_id)
+        logger.info("Fila restaurada em %s: %s músicas", player.guild_id, len(player.queue))
+
+    def destroy_player(self, guild_id):
+        """Descarta todo o estado de um servidor (chamado quando o bot sai do canal de voz)"""
+        self.idle_timers.cancel(guild_id)
+        self.extractor.cancel_guild(guild_id)
+        player = self.players.pop(guild_id, None)
+        if player is not None:
+            player.teardown()
+            logger.debug("Estado do servidor %s descartado", guild_id)
+        # Ao desligar o bot as conexões de voz também caem: aí o snapshot é mantido
+        if not self.bot.is_closed():
+            self.snapshot.forget(guild_id)
+
+    async def restore_sessions(self):
+        """
+        Retoma as filas salvas antes do último reinício.
+        Só a lista de servidores é lida agora; cada fila é descompactada quando o
+        servidor é retomado, e URLs ainda válidas não são buscadas de novo.
+        """
+        self.saved_sessions = self.snapshot.load()
+        self.snapshot.start(self._collect_snapshot)
+        for guild_id, saved in list(self.saved_sessions.items()):
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                # Servidor de outro processo de shards (ou o bot saiu dele)
+                continue
+            channel = guild.get_channel(saved.voice_channel_id) if saved.voice_channel_id else None
+            if channel is None or not any(not member.bot for member in channel.members):
+                # Ninguém para ouvir: a fila continua disponível para o próximo /music
+                continue
+            voice_client = await self.join_voice(channel)
+            if not voice_client:
+                continue
+            player = self.get_player(guild_id)
+            if player.queue and not voice_client.is_playing() and not voice_client.is_paused():
+                await self.play_next(voice_client, guild_id)
+
+    def _collect_metrics(self):
+        """Atualiza os gauges de filas, conexões e cache (chamado a cada leitura de /metrics)"""
+        QUEUE_DEPTH.clear()
+        total = 0
+        for guild_id, player in self.players.items():
+            total += len(player.queue)
+            if METRICS_SETTINGS['per_guild_queue_depth']:
+                QUEUE_DEPTH.set(len(player.queue), guild=guild_id)
+        QUEUED_TRACKS.set(total)
+        ACTIVE_PLAYERS.set(len(self.players))
+        VOICE_CLIENTS.set(len(self.bot.voice_clients))
+        CACHE_HIT_RATIO.set(self.cache.stats()['hit_rate'])
+
+    def get_position(self, player):
+        """Posição (segundos) da música atual do servidor, pelos frames já tocados"""
+        if player.source is not None:
+            return player.source.frames_played * FRAME_MS / 1000
+        return time.time() - player.started_at if player.started_at else 0
+
+    def should_resume(self, player, source, error):
+        """
+        Decide se a música deve ser retomada de onde parou em vez de pulada.
+        Só vale quando o stream terminou sozinho (ou com erro) bem antes do fim
+        previsto; stop() (skip, sair do canal) não esgota a fonte.
+        """
+        if player.retries >= PLAYBACK_SETTINGS['resume_attempts']:
+            return False
+        if not (error or source.exhausted):
+            return False
+        song = source.song
+        if not player.queue or player.queue[0] is not song or not song.duration:
+            return False
+        position = source.frames_played * FRAME_MS / 1000
+        return position < song.duration - PLAYBACK_SETTINGS['resume_tolerance']
+
+    def _collect_snapshot(self, dirty):
+        """Monta o checkpoint dos servidores alterados (chamado pelo QueueSnapshot)"""
+        sessions = {}
+        positions = {}
+        for guild_id in dirty:
+            player = self.players.get(guild_id)
+            if player is None:
+                continue
+            if not player.queue:
+                self.snapshot.forget(guild_id)
+                continue
+            guild = self.bot.get_guild(guild_id)
+            voice_client = guild.voice_client if guild else None
+            sessions[guild_id] = (
+                voice_client.channel.id if voice_client else None,
+                player.text_channel.id if player.text_channel else None,
+                self.get_position(player),
+                [song.to_row() for song in player.queue]
+            )
+        for guild_id, player in self.players.items():
+            if guild_id not in sessions and player.queue and player.started_at:
+                positions[guild_id] = self.get_position(player)
+        return sessions, positions
+
     def get_queue(self, guild_id):
-        """Retorna a fila de músicas do servidor"""
-        if guild_id not in self.queues:
-            self.queues[guild_id] = deque()
-        return self.queues[guild_id]
+        """Retorna a fila de músicas do servidor (vazia se não houver player)"""
+        player = self.players.get(guild_id)
+        return player.queue if player else ()
 
     async def play_next(self, voice_client, guild_id):
         """Toca a próxima música da fila"""
         try:
-            # Verifica se o FFmpeg está funcionando
-            try:
-                ffmpeg_version = subprocess.check_output([str(self.ffmpeg_path), '-version']).decode()
-                print(f"[DEBUG] FFmpeg versão: {ffmpeg_version.split()[2]}")
-            except Exception as e:
-                print(f"[ERRO] FFmpeg não está funcionando corretamente: {e}")
+            # O FFmpeg é verificado uma única vez na inicialização
+            if not self.ffmpeg_info:
+                logger.error("FFmpeg não está funcionando corretamente")
                 return
 
-            queue = self.get_queue(guild_id)
-            if not queue:
-                print("[DEBUG] Fila vazia, nada para tocar")
-                return
+            player = self.players.get(guild_id)
+            # Um loop (e não recursão) para pular músicas que falham: uma fila longa
+            # de links mortos não empilha chamadas
+            while True:
+                if not player or not player.queue:
+                    logger.debug("Fila vazia, nada para tocar")
+                    if player:
+                        player.started_at = player.ended_at = 0
+                        player.source = None
+                        self.snapshot.mark(guild_id)
+                    return
+                queue = player.queue
 
-            # Pega a próxima música da fila
-            song = queue[0]
-            url = song['url']
-            title = song['title']
-
-            print(f"[DEBUG] Preparando para tocar: {title}")
-            print(f"[DEBUG] URL: {url}")
-
-            def after_playing(error):
-                """Callback após a música terminar"""
-                if error:
-                    print(f"[DEBUG] Erro na reprodução: {error}")
-                print("[DEBUG] Música terminou, chamando play_next")
-                # Remove a música da fila apenas quando terminar de tocar
-                if queue:
-                    queue.popleft()
-                    print(f"[DEBUG] Música removida da fila após terminar. Tamanho atual: {len(queue)}")
-                # Cria uma nova task para tocar a próxima música
-                asyncio.run_coroutine_threadsafe(
-                    self.play_next(voice_client, guild_id),
-                    self.bot.loop
-                )
+                # Pega a próxima música da fila
+                song = queue[0]
 
-            try:
-                # Configurações do FFmpeg para evitar cortes
-                ffmpeg_options = {
-                    'options': '-vn -b:a 192k -ar 48000 -ac 2 -loglevel error',
-                    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
-                }
-
-                # Toca a música
-                print("[DEBUG] Iniciando FFmpegPCMAudio")
-                print(f"[DEBUG] Caminho do FFmpeg: {self.ffmpeg_path}")
-                print(f"[DEBUG] Opções do FFmpeg: {ffmpeg_options}")
-                
-                # Verifica se a URL é válida
+                # Aproveita a resolução feita em segundo plano, se houver
+                pending, player.prefetch = player.prefetch, None
+                if pending:
+                    prefetched_song, task = pending
+                    if prefetched_song is song:
+                        await asyncio.wait({task})
+                    else:
+                        task.cancel()
+
+                # Retomada após o stream cair: espera um pouco e obtém uma URL nova
+                retrying = player.retries > 0
+                if retrying:
+                    # Marca como iniciando para o enqueue não disparar outro play_next na espera
+                    player.starting = True
+                    try:
+                        await asyncio.sleep(PLAYBACK_SETTINGS['resume_delay'] * 2 ** (player.retries - 1))
+                    finally:
+                        player.starting = False
+                    if not queue or queue[0] is not song:
+                        player.retries = player.resume_at = 0
+                        continue
+
+                # Garante que a URL do stream ainda é válida
                 try:
-                    response = subprocess.run(
-                        [str(self.ffmpeg_path), '-i', url, '-f', 'null', '-'],
-                        capture_output=True,
-                        text=True,
-                        timeout=5
+                    await self.resolve_song(song, guild_id, force=retrying)
+                    # Teste opcional da URL: se falhar, força uma nova resolução
+                    if (FFMPEG_SETTINGS['probe_urls'] and not self.audio_cache.contains(song.id)
+                            and not await self.probe_url(song.url)):
+                        logger.debug("URL inválida, renovando: %s", song.title)
+                        await self.resolve_song(song, guild_id, force=True)
+                except Exception as e:
+                    logger.warning("Erro ao renovar URL, usando a anterior: %s", e)
+
+                # Sem URL (ou com uma já vencida) a música daria 403: pula direto
+                if (not song.url or song.expires_at <= time.time()) and not self.audio_cache.contains(song.id):
+                    logger.warning("Sem URL válida para tocar, pulando: %s", song.title)
+                    queue.popleft()
+                    player.retries = player.resume_at = 0
+                    self.snapshot.mark(guild_id)
+                    continue
+
+                url = song.url
+                title = song.title
+
+                logger.debug("Preparando para tocar: %s (%s)", title, url)
+
+                def after_playing(error):
+                    """Callback após a música terminar"""
+                    if error:
+                        logger.warning("Erro na reprodução: %s", error)
+                    player.ended_at = time.perf_counter()
+                    source = player.source
+                    if source is not None and self.should_resume(player, source, error):
+                        # O stream caiu no meio da música: ela continua na fila e
+                        # o play_next a retoma na posição em que parou
+                        player.retries += 1
+                        player.resume_at = self.get_position(player)
+                        RESUMES.inc()
+                        logger.warning(
+                            "Stream interrompido em %.1fs, retomando (%s/%s): %s", player.resume_at,
+                            player.retries, PLAYBACK_SETTINGS['resume_attempts'], source.song.title
+                        )
+                    else:
+                        player.retries = 0
+                        # Remove a música da fila apenas quando terminar de tocar
+                        if queue:
+                            queue.popleft()
+                        logger.debug("Música terminou, restam %s na fila", len(queue))
+                    # Cria uma nova task para tocar a próxima música
+                    asyncio.run_coroutine_threadsafe(
+                        self.play_next(voice_client, guild_id),
+                        self.bot.loop
                     )
-                    print(f"[DEBUG] Teste de URL: {response.stderr}")
+
+                try:
+                    # Toca a música
+                    # Retomada (após reiniciar o bot ou o stream cair): começa na posição salva
+                    start, player.resume_at = player.resume_at, 0
+                    try:
+                        source = self.create_song_source(song, start)
+                    except StreamUnavailable:
+                        # O arquivo sumiu do cache de áudio depois da resolução
+                        await self.resolve_song(song, guild_id, force=True)
+                        source = self.create_song_source(song, start)
+                    if PLAYBACK_SETTINGS['gapless']:
+                        source = self.create_gapless_source(player, source, song)
+                        source.frames_played = int(start * 1000 / FRAME_MS)
+                    else:
+                        source = CountingAudioSource(source, song, int(start * 1000 / FRAME_MS))
+                    player.source = source
+                    voice_client.play(source, after=after_playing)
+                    player.started_at = time.time() - start
+                    self.snapshot.mark(guild_id)
+                    # Resolve a próxima música enquanto esta toca
+                    self.schedule_prefetch(guild_id)
+                    if retrying:
+                        # A mesma música continuando: não conta nem anuncia de novo
+                        player.ended_at = 0
+                        return
+
+                    if player.ended_at:
+                        TRANSITION_GAP_SECONDS.observe(time.perf_counter() - player.ended_at)
+                        player.ended_at = 0
+                    TRACKS_STARTED.inc()
+                    self.audio_cache.record_play(song)
+                    self.analyze_loudness(song)
+
+                    # Envia mensagem no canal de texto apenas quando uma nova música começa a tocar
+                    await self.announce_song(player, title)
+                    return
+
                 except Exception as e:
-                    print(f"[DEBUG] Erro ao testar URL: {e}")
-                
-                voice_client.play(
-                    discord.FFmpegPCMAudio(
-                        url,
-                        executable=str(self.ffmpeg_path),
-                        **ffmpeg_options
-                    ),
-                    after=after_playing
+                    logger.error("Erro ao tocar música: %s", e, exc_info=True)
+                    # Se der erro, remove a música que falhou e tenta a próxima
+                    player.retries = 0
+                    if queue:
+                        queue.popleft()
+
+        except Exception as e:
+            logger.error("Erro em play_next: %s", e, exc_info=True)
+
+    def create_song_source(self, song, start=0):
+        """
+        Cria a fonte de áudio de uma música da fila.
+        Usa o arquivo do cache local de áudio quando existir. Com a transmissão
+        compartilhada ativa, a fonte é um leitor do FFmpeg que outros servidores
+        tocando a mesma música (na mesma posição) já abriram.
+        """
+        gain = self.loudness.gain(song.id)
+        if self.broadcasts is not None and song.id:
+            return self.broadcasts.open(
+                (song.id, round(gain, 2)),
+                int(start * 1000 / FRAME_MS),
+                lambda frame: self._open_song_source(song, frame * FRAME_MS / 1000, gain)
+            )
+        return self._open_song_source(song, start, gain)
+
+    def _open_song_source(self, song, start, gain):
+        """Inicia o FFmpeg de uma música (arquivo do cache de áudio ou stream)"""
+        local = self.audio_cache.lookup(song.id)
+        if local:
+            path, codec = local
+            logger.debug("Tocando do cache de áudio: %s", path)
+            with FFMPEG_SPAWN_SECONDS.time(source='local'):
+                return self.create_source(path, codec, local=True, start=start, gain=gain)
+        if not song.url or song.expires_at <= time.time():
+            # resolve_song dispensou a URL porque a música estava no cache de áudio,
+            # mas o arquivo foi descartado desde então (LRU, outro shard, truncado)
+            raise StreamUnavailable(song.title)
+        with FFMPEG_SPAWN_SECONDS.time(source='stream'):
+            return self.create_source(song.url, song.acodec, start=start, gain=gain)
+
+    def _with_start(self, options, start):
+        """Adiciona o -ss (posição inicial) às opções de entrada do FFmpeg"""
+        if not start:
+            return options
+        before = options.get('before_options', '')
+        return {**options, 'before_options': f"-ss {start:.2f} {before}".strip()}
+
+    def _with_gain(self, options, gain):
+        """Adiciona o filtro de ganho fixo (normalização de volume) às opções de saída"""
+        if not gain:
+            return options
+        return {**options, 'options': f"{options['options']} -af volume={gain:.2f}dB"}
+
+    def create_source(self, url, codec=None, local=False, start=0, gain=0):
+        """
+        Inicia o FFmpeg para uma URL e retorna a fonte de áudio.
+        No modo Opus passthrough, streams Opus são copiados sem recodificação;
+        outros formatos são convertidos para Opus pelo próprio FFmpeg (se tiver
+        libopus) e, em último caso, decodificados para PCM.
+        Arquivos locais não usam as opções de reconexão (só valem para HTTP).
+        `start` começa a música nessa posição (segundos) e `gain` aplica um
+        ganho fixo (dB); na cópia do Opus não há filtro, então o ganho só vale
+        se LOUDNESS_SETTINGS['transcode_passthrough'] permitir recodificar.
+        """
+        if PLAYBACK_SETTINGS['opus_passthrough']:
+            opus_options = {'options': self.opus_options['options']} if local else self.opus_options
+            opus_options = self._with_start(opus_options, start)
+            # Recodificar um stream Opus só para aplicar o ganho é opcional (custa CPU)
+            if codec == 'opus' and not (gain and self.gain_applies(codec)):
+                # O discord.py só gera "-c:a copy" para codec 'opus'/'libopus';
+                # qualquer outro valor (inclusive 'copy') vira recodificação com libopus
+                return discord.FFmpegOpusAudio(
+                    url,
+                    codec='opus',
+                    executable=str(self.ffmpeg_path),
+                    **opus_options
+                )
+            if self.ffmpeg_info.get('libopus'):
+                return discord.FFmpegOpusAudio(
+                    url,
+                    bitrate=PLAYBACK_SETTINGS['opus_bitrate'],
+                    executable=str(self.ffmpeg_path),
+                    **self._with_gain(opus_options, gain)
                 )
-                print("[DEBUG] FFmpegPCMAudio iniciado com sucesso")
+        ffmpeg_options = {'options': self.ffmpeg_options['options']} if local else self.ffmpeg_options
+        ffmpeg_options = self._with_gain(self._with_start(ffmpeg_options, start), gain)
+        return discord.FFmpegPCMAudio(
+            url,
+            executable=str(self.ffmpeg_path),
+            **ffmpeg_options
+        )
 
-                # Envia mensagem no canal de texto apenas quando uma nova música começa a tocar
-                if guild_id in self.text_channels:
-                    channel = self.text_channels[guild_id]
-                    try:
-                        await channel.send(f"🎵 Tocando agora: **{title}**")
-                        print("[DEBUG] Mensagem de reprodução enviada")
-                    except Exception as e:
-                        print(f"[DEBUG] Erro ao enviar mensagem de reprodução: {e}")
+    def gain_applies(self, codec):
+        """
+        Indica se o ganho de volume chega ao áudio de uma fonte com esse codec.
+        No Opus passthrough, streams Opus são copiados sem filtro, a menos que
+        LOUDNESS_SETTINGS['transcode_passthrough'] permita recodificá-los.
+        """
+        if not PLAYBACK_SETTINGS['opus_passthrough'] or codec != 'opus':
+            return True
+        return self.loudness.transcode_passthrough and bool(self.ffmpeg_info.get('libopus'))
 
-            except Exception as e:
-                print(f"[ERRO] Erro ao tocar música: {e}")
-                import traceback
-                print(f"[DEBUG] Stack trace: {traceback.format_exc()}")
-                # Se der erro, tenta tocar a próxima
-                if queue:
-                    queue.popleft()  # Remove a música que falhou
-                await self.play_next(voice_client, guild_id)
+    def create_gapless_source(self, player, source, song):
+        """
+        Envolve a fonte em um GaplessAudioSource: o FFmpeg da próxima música é
+        iniciado antes do fim da atual e a troca acontece sem pausa.
+        """
+        loop = self.bot.loop
+
+        def on_need_next(current_song):
+            # Roda na thread do player: só agenda o pré-carregamento
+            asyncio.run_coroutine_threadsafe(self._preload_next(player, gapless), loop)
+
+        def on_switch(new_song):
+            # Roda na thread do player: só agenda a atualização da fila
+            asyncio.run_coroutine_threadsafe(self._on_gapless_switch(player, new_song), loop)
+
+        gapless = GaplessAudioSource(
+            source,
+            song,
+            on_need_next=on_need_next,
+            on_switch=on_switch,
+            preload_seconds=PLAYBACK_SETTINGS['preload_seconds'],
+            prebuffer_frames=PLAYBACK_SETTINGS['prebuffer_frames'],
+            crossfade=PLAYBACK_SETTINGS['crossfade']
+        )
+        player.gapless = gapless
+        return gapless
 
+    async def _preload_next(self, player, gapless):
+        """Inicia o FFmpeg da próxima música da fila e entrega ao GaplessAudioSource"""
+        queue = player.queue
+        if len(queue) < 2 or player.gapless is not gapless:
+            return
+        song = queue[1]
+
+        # Aproveita a resolução feita em segundo plano, se houver
+        pending = player.prefetch
+        if pending and pending[0] is song:
+            await asyncio.wait({pending[1]})
+        try:
+            await self.resolve_song(song, player.guild_id, self.time_until_next(player))
+        except Exception as e:
+            logger.warning("Erro ao renovar URL da próxima música: %s", e)
+
+        # A fila pode ter mudado enquanto a URL era resolvida
+        if len(queue) < 2 or queue[1] is not song or player.gapless is not gapless:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            # Iniciar o processo do FFmpeg é síncrono: roda fora do event loop
+            try:
+                source = await loop.run_in_executor(None, self.create_song_source, song)
+            except StreamUnavailable:
+                await self.resolve_song(song, player.guild_id, self.time_until_next(player), force=True)
+                if len(queue) < 2 or queue[1] is not song or player.gapless is not gapless:
+                    return
+                source = await loop.run_in_executor(None, self.create_song_source, song)
         except Exception as e:
-            print(f"[ERRO] Erro em play_next: {e}")
-            import traceback
-            print(f"[DEBUG] Stack trace: {traceback.format_exc()}")
+            logger.warning("Erro ao pré-carregar o FFmpeg da próxima música: %s", e)
+            return
+        gapless.set_next(source, song)
+        logger.debug("FFmpeg da próxima música iniciado: %s", song.title)
+
+    async def _on_gapless_switch(self, player, song):
+        """Atualiza a fila quando o GaplessAudioSource troca de música"""
+        queue = player.queue
+        # Remove a música que terminou (a nova passa a ser a primeira da fila)
+        if len(queue) > 1 and queue[1] is song:
+            queue.popleft()
+        player.started_at = time.time()
+        GAPLESS_SWITCHES.inc()
+        TRACKS_STARTED.inc()
+        self.snapshot.mark(player.guild_id)
+        self.audio_cache.record_play(song)
+        self.analyze_loudness(song)
+        self.schedule_prefetch(player.guild_id)
+        await self.announce_song(player, song.title)
+
+    async def announce_song(self, player, title):
+        """
+        Avisa no canal de texto que uma nova música começou a tocar.
+        Se o aviso anterior ainda é a última mensagem do canal, ele é editado
+        (com debounce, pelo MessageEditor) em vez de mandar uma mensagem nova.
+        """
+        channel = player.text_channel
+        if not channel:
+            return
+        content = f"🎵 Tocando agora: **{title}**"
+        message = player.now_playing
+        if message is not None and message.id == getattr(channel, 'last_message_id', None):
+            self.editor.edit(message, content)
+            return
+        try:
+            player.now_playing = await channel.send(content)
+        except Exception as e:
+            logger.debug("Erro ao enviar mensagem de reprodução: %s", e)
 
     async def play_audio(self, voice_client, text_channel, search):
         """Reproduz áudio do YouTube"""
@@ -221,82 +678,379 @@ class MusicManager:
             elif voice_client.channel != voice_client.channel:
                 await voice_client.move_to(voice_client.channel)
 
-            # Verifica se é uma URL do YouTube
-            if not search.startswith(('http://', 'https://')):
-                search = f"ytsearch:{search}"
+            # Playlists: entradas são adicionadas aos poucos, sem resolver cada uma
+            if PLAYLIST_SETTINGS['enabled'] and is_playlist_url(search):
+                return await self.play_playlist(voice_client, text_channel, search)
 
-            print(f"[DEBUG] Buscando com yt-dlp: {search}")
-            
             # Tenta extrair informações do vídeo
             try:
-                with yt_dlp.YoutubeDL(self.ytdl_opts) as ydl:
-                    print("[DEBUG] Iniciando extração de informações...")
-                    info = ydl.extract_info(search, download=False)
-                    print(f"[DEBUG] Informações extraídas: {info is not None}")
-                    
-                    if not info:
-                        print("[DEBUG] Nenhuma informação retornada pelo yt-dlp")
-                        await text_channel.send("❌ Não foi possível encontrar o vídeo. Por favor, tente novamente.")
-                        return {'success': False, 'error': 'Não foi possível encontrar o vídeo.'}
-                        
-                    if 'entries' in info:
-                        if not info['entries']:
-                            print("[DEBUG] Lista de resultados vazia")
-                            await text_channel.send("❌ Nenhum resultado encontrado para sua busca!")
-                            return {'success': False, 'error': 'Nenhum resultado encontrado!'}
-                        info = info['entries'][0]
-                        print(f"[DEBUG] Primeiro resultado encontrado: {info.get('title', 'Sem título')}")
-                        
-                    if not info or not info.get('url'):
-                        print("[DEBUG] URL não encontrada nas informações do vídeo")
-                        await text_channel.send("❌ Não foi possível obter a URL do áudio!")
-                        return {'success': False, 'error': 'Não foi possível obter a URL do áudio.'}
-                        
-                    # Adiciona à fila
-                    guild_id = voice_client.guild.id
-                    if guild_id not in self.queues:
-                        self.queues[guild_id] = deque()
-                        self.text_channels[guild_id] = text_channel
-                        
-                    self.queues[guild_id].append({
-                        'url': info['url'],
-                        'title': info.get('title', 'Título desconhecido'),
-                        'duration': info.get('duration', 0),
-                        'info': {
-                            'title': info.get('title', 'Título desconhecido'),
-                            'url': info['url']
-                        }
-                    })
-                    
-                    # Se não estiver tocando nada, inicia a reprodução
-                    if not voice_client.is_playing():
-                        await self.play_next(voice_client, guild_id)
-                        return {
-                            'success': True,
-                            'message': f"🎵 Tocando agora: **{info.get('title', 'Título desconhecido')}**",
-                            'is_playing': True
-                        }
-                    else:
-                        return {
-                            'success': True,
-                            'message': f"🎵 Adicionado à fila: **{info.get('title', 'Título desconhecido')}**",
-                            'is_playing': False
-                        }
-                        
+                guild_id = voice_client.guild.id
+                song = await self.find_song(search, guild_id)
+
+                # Adiciona à fila
+                self.get_player(guild_id, text_channel)
+
+                # Se não estiver tocando nada, inicia a reprodução
+                if await self.enqueue(voice_client, guild_id, song):
+                    return {
+                        'success': True,
+                        'message': f"🎵 Tocando agora: **{song.title}**",
+                        'is_playing': True
+                    }
+                else:
+                    return {
+                        'success': True,
+                        'message': f"🎵 Adicionado à fila: **{song.title}**",
+                        'is_playing': False
+                    }
+
+            except SongNotFound as e:
+                await text_channel.send(f"❌ {e}")
+                return {'success': False, 'error': str(e)}
+            except asyncio.TimeoutError:
+                logger.warning("Tempo limite da busca excedido: %s", search)
+                return {'success': False, 'error': 'A busca demorou demais. Tente novamente.'}
+            except ExtractionCancelled as e:
+                logger.debug("Busca cancelada: %s", search)
+                return {'success': False, 'error': str(e)}
             except Exception as e:
-                print(f"[DEBUG] Erro na busca: {str(e)}")
-                print(f"[DEBUG] Tipo do erro: {type(e)}")
-                import traceback
-                print(f"[DEBUG] Stack trace: {traceback.format_exc()}")
+                logger.warning("Erro na busca: %s", e)
+                logger.debug("Detalhes do erro na busca", exc_info=True)
                 return {'success': False, 'error': str(e)}
-                
+
+        except Exception as e:
+            logger.error("Erro geral: %s", e, exc_info=True)
+            return {'success': False, 'error': str(e)}
+
+    async def find_song(self, search, guild_id, batch=False):
+        """
+        Busca uma música: consulta o cache e, se preciso, o yt-dlp.
+
+        Args:
+            search (str): URL ou texto da busca
+            guild_id (int): Servidor que fez o pedido
+            batch (bool): Busca de um lote (usa o limite de lote do extrator)
+
+        Returns:
+            Track: Música pronta para entrar na fila
+
+        Raises:
+            SongNotFound: Se a busca não encontrar nada tocável
+        """
+        # Consulta o cache antes de buscar no YouTube
+        query = search
+        info = self.cache.get(query)
+        if info and info['url']:
+            logger.debug("Cache hit: %s", info['title'])
+            return Track.from_info(info, search)
+
+        if info:
+            # Metadados em cache, só a URL do stream expirou: evita a busca
+            search = info['webpage_url']
+        # Verifica se é uma URL do YouTube
+        elif not search.startswith(('http://', 'https://')):
+            search = f"ytsearch:{search}"
+
+        logger.debug("Buscando com yt-dlp: %s", search)
+        info = await self.extractor.extract(search, self.ytdl_opts, guild_id=guild_id, batch=batch)
+
+        if not info:
+            logger.debug("Nenhuma informação retornada pelo yt-dlp")
+            raise SongNotFound("Não foi possível encontrar o vídeo. Por favor, tente novamente.")
+
+        if 'entries' in info:
+            if not info['entries']:
+                logger.debug("Lista de resultados vazia")
+                raise SongNotFound("Nenhum resultado encontrado para sua busca!")
+            info = info['entries'][0]
+
+        if not info or not info.get('url'):
+            logger.debug("URL não encontrada nas informações do vídeo")
+            raise SongNotFound("Não foi possível obter a URL do áudio!")
+
+        self.cache.put(query, info)
+        return Track.from_info(info, search)
+
+    async def play_many(self, voice_client, text_channel, searches):
+        """
+        Adiciona várias músicas de uma vez.
+        As buscas rodam em paralelo (limitadas pelo 'batch_limit' do extrator),
+        mas as músicas entram na fila na ordem original; cada uma entra assim
+        que ela e as anteriores estiverem prontas, então a primeira já começa a tocar.
+
+        Returns:
+            dict: Mesmo formato do play_audio, com um único resumo em 'message'
+        """
+        if not voice_client.is_connected():
+            return {'success': False, 'error': 'Você precisa estar em um canal de voz!'}
+
+        searches = searches[:BULK_SETTINGS['max_entries']]
+        guild_id = voice_client.guild.id
+        player = self.get_player(guild_id, text_channel)
+
+        # Roda como as playlists: /stop cancela o lote junto com as playlists
+        task = asyncio.create_task(self._ingest_many(voice_client, guild_id, searches))
+        player.playlist_tasks.add(task)
+        task.add_done_callback(player.playlist_tasks.discard)
+        await asyncio.wait((task,))
+        if task.cancelled():
+            return {'success': False, 'error': 'Busca cancelada.'}
+        added, failed, playing = task.result()
+
+        if not added:
+            return {'success': False, 'error': f"Nenhuma das {len(searches)} músicas foi encontrada."}
+
+        message = f"📋 {len(added)} músicas adicionadas à fila."
+        if playing:
+            message = f"🎵 Tocando agora: **{playing.title}**\n" + message
+        if failed:
+            names = ", ".join(search[:60] for search in failed[:5]) + (f" e mais {len(failed) - 5}" if len(failed) > 5 else "")
+            message += f"\n❌ Não encontradas ({len(failed)}): {names}"
+        return {'success': True, 'message': message, 'is_playing': playing is not None}
+
+    async def _ingest_many(self, voice_client, guild_id, searches):
+        """
+        Resolve as buscas de um lote e as adiciona à fila na ordem original.
+
+        Returns:
+            tuple: (músicas adicionadas, buscas que falharam, música que começou a tocar)
+        """
+        lookups = [
+            asyncio.create_task(self.find_song(search, guild_id, batch=True))
+            for search in searches
+        ]
+        added = []
+        failed = []
+        playing = None
+        try:
+            for search, lookup in zip(searches, lookups):
+                try:
+                    song = await lookup
+                except ExtractionCancelled:
+                    break
+                except Exception as e:
+                    logger.debug("Item do lote não encontrado (%s): %s", search, e)
+                    failed.append(search)
+                    continue
+                if await self.enqueue(voice_client, guild_id, song):
+                    playing = song
+                added.append(song)
+        finally:
+            # Interrompido (/stop): descarta as buscas que sobraram
+            for lookup in lookups:
+                if not lookup.done():
+                    lookup.cancel()
+                elif not lookup.cancelled():
+                    lookup.exception()
+        return added, failed, playing
+
+    async def enqueue(self, voice_client, guild_id, song):
+        """
+        Adiciona uma música à fila e inicia a reprodução se nada estiver tocando.
+
+        Returns:
+            bool: True se a música começou a tocar agora
+        """
+        player = self.get_player(guild_id)
+        queue = player.queue
+        queue.append(song)
+        self.snapshot.mark(guild_id)
+        # No fundo da fila só o ID importa: a URL continua no cache de metadados e é
+        # reaproveitada (ou renovada) quando a música chegar perto de tocar
+        if len(queue) > 2 and self.cache.enabled:
+            song.set_stream(None, song.acodec)
+
+        if (not voice_client.is_playing() and not voice_client.is_paused()
+                and not player.starting):
+            # Evita que duas chamadas simultâneas iniciem a reprodução duas vezes
+            player.starting = True
+            try:
+                await self.play_next(voice_client, guild_id)
+            finally:
+                player.starting = False
+            return True
+
+        # A música entrou logo após a atual: já resolve em segundo plano
+        if len(queue) == 2:
+            self.schedule_prefetch(guild_id)
+            # A atual já está no fim: inicia o FFmpeg da nova imediatamente
+            gapless = player.gapless
+            if gapless is not None and gapless.wants_next():
+                asyncio.create_task(self._preload_next(player, gapless))
+        return False
+
+    async def play_playlist(self, voice_client, text_channel, url):
+        """
+        Toca uma playlist: a primeira entrada começa assim que é listada e o
+        restante é adicionado à fila aos poucos, em segundo plano.
+        """
+        guild_id = voice_client.guild.id
+        entries = self.extractor.iter_playlist(
+            url, self.ytdl_opts, guild_id=guild_id, max_entries=PLAYLIST_SETTINGS['max_entries']
+        )
+        try:
+            first = await anext(entries, None)
+        except asyncio.TimeoutError:
+            await entries.aclose()
+            return {'success': False, 'error': 'A playlist demorou demais para carregar. Tente novamente.'}
         except Exception as e:
-            print(f"[DEBUG] Erro geral: {str(e)}")
+            await entries.aclose()
+            logger.warning("Erro ao carregar playlist: %s", e)
             return {'success': False, 'error': str(e)}
 
+        if first is None:
+            await entries.aclose()
+            return {'success': False, 'error': 'A playlist está vazia ou é privada.'}
+
+        player = self.get_player(guild_id, text_channel)
+        is_playing = await self.enqueue(voice_client, guild_id, Track.from_info(first))
+
+        # O restante da playlist entra na fila em segundo plano
+        task = asyncio.create_task(self._ingest_playlist(voice_client, guild_id, entries, text_channel))
+        player.playlist_tasks.add(task)
+        task.add_done_callback(player.playlist_tasks.discard)
+
+        action = "Tocando agora" if is_playing else "Adicionado à fila"
+        return {
+            'success': True,
+            'message': f"🎵 {action}: **{first['title']}** (carregando o restante da playlist...)",
+            'is_playing': is_playing
+        }
+
+    async def _ingest_playlist(self, voice_client, guild_id, entries, text_channel):
+        """Adiciona as entradas restantes de uma playlist à fila conforme chegam"""
+        added = 1
+        try:
+            async for entry in entries:
+                await self.enqueue(voice_client, guild_id, Track.from_info(entry))
+                added += 1
+        except (asyncio.CancelledError, ExtractionCancelled):
+            return
+        except Exception as e:
+            logger.warning("Erro ao carregar o restante da playlist: %s", e)
+        finally:
+            await entries.aclose()
+
+        try:
+            await text_channel.send(f"📋 {added} músicas da playlist adicionadas à fila.")
+        except Exception as e:
+            logger.debug("Erro ao enviar resumo da playlist: %s", e)
+
+    async def probe_url(self, url):
+        """
+        Teste rápido e assíncrono da URL: lê só o início do stream.
+        Não bloqueia o event loop e é limitado por FFMPEG_SETTINGS['probe_timeout'].
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                str(self.ffmpeg_path), '-v', 'error', '-t', '0.5', '-i', url, '-f', 'null', '-',
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except Exception as e:
+            logger.debug("Erro ao testar URL: %s", e)
+            return True
+        try:
+            return await asyncio.wait_for(process.wait(), FFMPEG_SETTINGS['probe_timeout']) == 0
+        except asyncio.TimeoutError:
+            # Lento demais para responder, mas não necessariamente inválida
+            process.kill()
+            await process.wait()
+            return True
+
+    def is_song_fresh(self, song, horizon=0):
+        """
+        Verifica se a URL do stream dura até o fim da música, começando daqui
+        a `horizon` segundos (com a folga configurada).
+        """
+        if not song.url:
+            return False
+        needed = horizon + (song.duration or 0) + self.cache.stream_url_margin
+        return song.expires_at - time.time() > needed
+
+    async def resolve_song(self, song, guild_id, horizon=0, force=False):
+        """
+        Garante uma URL de stream válida para uma música da fila.
+        Reaproveita a URL atual ou a do cache de metadados (compartilhado entre
+        servidores) enquanto forem válidas; só então recorre ao yt-dlp.
+
+        Args:
+            horizon (float): Daqui a quantos segundos a música deve começar
+            force (bool): Ignora a URL atual, a do cache e o cache local de áudio
+                          (ex.: URL recusada no teste, arquivo local descartado)
+        """
+        if not force:
+            # Músicas no cache local de áudio não dependem da URL do stream
+            if self.audio_cache.contains(song.id) or self.is_song_fresh(song, horizon):
+                return song
+            info = self.cache.get(song.webpage_url)
+            if info and info['url']:
+                song.set_stream(info['url'], info.get('acodec'), info.get('stream_updated_at'))
+                if self.is_song_fresh(song, horizon):
+                    return song
+        logger.debug("Renovando URL do stream: %s", song.title)
+        info = await self.extractor.extract(song.webpage_url, self.ytdl_opts, guild_id=guild_id)
+        if info and info.get('url'):
+            song.set_stream(info['url'], info.get('acodec'))
+            self.cache.put(song.webpage_url, info)
+        return song
+
+    def time_until_next(self, player):
+        """Segundos até a música atual terminar (estimativa para resolver a próxima)"""
+        if not player.queue or not player.started_at:
+            return 0
+        return max(0.0, (player.queue[0].duration or 0) - self.get_position(player))
+
+    async def _prefetch(self, guild_id, song, horizon=0):
+        """Resolve a próxima música da fila em segundo plano"""
+        try:
+            await self.resolve_song(song, guild_id, horizon)
+            logger.debug("Próxima música pronta: %s", song.title)
+            # Com a URL em mãos, mede a loudness antes de a música começar
+            self.analyze_loudness(song)
+        except (asyncio.CancelledError, ExtractionCancelled):
+            pass
+        except Exception as e:
+            logger.warning("Erro ao pré-carregar próxima música: %s", e)
+
+    def analyze_loudness(self, song):
+        """
+        Agenda a medição da loudness de uma música (só na primeira vez que ela aparece).
+        Músicas que tocam pela cópia do Opus não são medidas: o ganho não seria aplicado.
+        """
+        codec = self.audio_cache.codec(song.id) if self.audio_cache.contains(song.id) else song.acodec
+        if song.url and self.gain_applies(codec):
+            self.loudness.schedule(song.id, song.url)
+
+    def _on_audio_cached(self, video_id, path):
+        """Música salva no cache de áudio: mede a loudness do arquivo local (mais barato)"""
+        if self.gain_applies(self.audio_cache.codec(video_id)):
+            self.loudness.schedule(video_id, path, local=True)
+
+    def schedule_prefetch(self, guild_id):
+        """Agenda a resolução da próxima música da fila (a que vem depois da atual)"""
+        player = self.players.get(guild_id)
+        if player is None:
+            return
+        player.cancel_prefetch()
+        if len(player.queue) < 2:
+            return
+        song = player.queue[1]
+        # A URL precisa durar até o fim da próxima música, não só até ela começar
+        task = self.bot.loop.create_task(self._prefetch(guild_id, song, self.time_until_next(player)))
+        player.prefetch = (song, task)
+
     async def skip(self, voice_client, guild_id):
         """Pula para a próxima música"""
         if voice_client.is_playing():
+            # No modo gapless, troca direto para a próxima música já iniciada
+            player = self.players.get(guild_id)
+            gapless = player.gapless if player else None
+            if gapless is not None and voice_client.source is gapless and gapless.advance():
+                self.end_skip_vote(guild_id)
+                return True
+            # O pré-carregamento da próxima música continua válido:
+            # play_next o aproveita e agenda o da música seguinte
             voice_client.stop()
             # Reseta o estado de votação de skip
             self.end_skip_vote(guild_id)
@@ -307,60 +1061,96 @@ class MusicManager:
         """Para a reprodução e limpa a fila"""
         if voice_client.is_playing():
             voice_client.stop()
-        queue = self.get_queue(guild_id)
-        queue.clear()
-        # Limpa o estado de votação de skip
-        self.end_skip_vote(guild_id)
+        # Limpa a fila, a votação de skip e cancela playlists e pré-carregamentos
+        # (o FFmpeg pré-carregado do modo gapless é finalizado no cleanup)
+        player = self.players.get(guild_id)
+        if player is not None:
+            player.teardown()
+            self.snapshot.forget(guild_id)
+        # Cancela buscas pendentes do servidor
+        self.extractor.cancel_guild(guild_id)
         return True
 
-    def get_queue_list(self, guild_id):
-        """Retorna uma string formatada com a lista de músicas na fila"""
+    def get_queue_page(self, guild_id, page=0, page_size=None):
+        """
+        Formata uma página da fila. Só as músicas da página são formatadas,
+        então o custo não cresce com o tamanho da fila.
+
+        Args:
+            page (int): Página desejada (0 = primeira); é ajustada aos limites
+            page_size (int): Músicas por página (padrão: QUEUE_PAGE_SETTINGS['page_size'])
+
+        Returns:
+            dict: 'text' (linhas da página), 'page', 'pages' e 'total'
+        """
+        page_size = page_size or QUEUE_PAGE_SETTINGS['page_size']
         queue = self.get_queue(guild_id)
-        if not queue:
-            return "A fila está vazia!"
-        
-        queue_list = ""
-        for i, song in enumerate(queue, 1):
-            title = song['info'].get('title', 'Música desconhecida')
-            queue_list += f"{i}. {title}\n"
-        return queue_list
+        total = len(queue)
+        pages = max(1, -(-total // page_size))
+        page = min(max(page, 0), pages - 1)
+        start = page * page_size
+        max_title = QUEUE_PAGE_SETTINGS['max_title']
+        lines = []
+        # Acesso por índice: a deque anda por blocos a partir da ponta mais próxima,
+        # sem percorrer (nem formatar) as músicas fora da página
+        for i in range(start, min(start + page_size, total)):
+            title = queue[i].title or 'Música desconhecida'
+            if len(title) > max_title:
+                title = title[:max_title - 1] + "…"
+            lines.append(f"{i + 1}. {title}")
+        return {'text': "\n".join(lines), 'page': page, 'pages': pages, 'total': total}
 
     def get_current_song(self, guild_id):
         """Retorna a música atual que está tocando"""
         queue = self.get_queue(guild_id)
         if queue:
-            return queue[0]['info'].get('title', 'Música desconhecida')
+            return queue[0].title or 'Música desconhecida'
         return None 
 
     def can_start_skip_vote(self, guild_id):
         """Verifica se uma nova votação de skip pode ser iniciada"""
-        return not self.skip_in_progress.get(guild_id, False)
+        player = self.players.get(guild_id)
+        return not (player and player.skip_in_progress)
 
-    def start_skip_vote(self, guild_id):
-        """Inicia uma nova votação de skip"""
-        self.skip_in_progress[guild_id] = True
-        self.skip_votes[guild_id] = set()
+    def start_skip_vote(self, guild_id, message=None, required=0):
+        """Inicia uma nova votação de skip (os votos chegam pelas reações em `message`)"""
+        player = self.get_player(guild_id)
+        player.skip_in_progress = True
+        player.skip_votes = set()
+        player.skip_message = message
+        player.skip_required = required
 
     def end_skip_vote(self, guild_id):
         """Finaliza a votação de skip atual"""
-        self.skip_in_progress[guild_id] = False
-        self.skip_votes[guild_id] = set()
+        player = self.players.get(guild_id)
+        if player is not None:
+            player.reset_skip_vote()
 
     def add_skip_vote(self, guild_id, user_id):
         """Adiciona um voto de skip"""
-        if guild_id in self.skip_votes:
-            self.skip_votes[guild_id].add(user_id)
-            return len(self.skip_votes[guild_id])
+        player = self.players.get(guild_id)
+        if player is not None:
+            player.skip_votes.add(user_id)
+            return len(player.skip_votes)
+        return 0
+
+    def remove_skip_vote(self, guild_id, user_id):
+        """Remove um voto de skip (reação retirada)"""
+        player = self.players.get(guild_id)
+        if player is not None:
+            player.skip_votes.discard(user_id)
+            return len(player.skip_votes)
         return 0
 
     def get_skip_votes(self, guild_id):
         """Retorna o número de votos atuais"""
-        return len(self.skip_votes.get(guild_id, set()))
+        player = self.players.get(guild_id)
+        return len(player.skip_votes) if player else 0
 
     def generate_cookies(self):
         """Gera um novo arquivo de cookies usando o yt-dlp"""
         try:
-            print("[DEBUG] Iniciando geração de cookies...")
+            logger.debug("Iniciando geração de cookies...")
             # Configurações para gerar cookies
             ydl_opts = {
                 'quiet': True,
@@ -374,9 +1164,9 @@ class MusicManager:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 ydl.download(['https://www.youtube.com/watch?v=dQw4w9WgXcQ'])  # Vídeo de teste
                 
-            print("[DEBUG] Arquivo de cookies gerado com sucesso!")
+            logger.info("Arquivo de cookies gerado com sucesso!")
             return True
             
         except Exception as e:
-            print(f"[ERRO] Erro ao gerar cookies: {e}")
+            logger.error("Erro ao gerar cookies: %s", e)
             return False
\ No newline at end of file
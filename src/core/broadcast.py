@@ -0,0 +1,184 @@
+"""
+Transmissão compartilhada de músicas entre servidores.
+Quando vários servidores tocam a mesma música ao mesmo tempo, um único FFmpeg
+(por música, posição e ganho) baixa e decodifica o áudio para um buffer
+circular; cada servidor lê desse buffer com o seu próprio BroadcastReader.
+Não há thread produtora: o leitor mais adiantado puxa o próximo frame do
+FFmpeg, os demais leem os frames já guardados.
+"""
+import logging
+import threading
+import discord
+from .sources import FRAME_MS
+from ..utils.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_READERS = Counter(
+    'amadeus_broadcast_readers_total', 'Leitores de transmissões por forma de entrada', labels=('result',)
+)
+BROADCASTS_ACTIVE = Gauge('amadeus_broadcasts_active', 'Transmissões (FFmpeg compartilhados) ativas')
+
+
+class Broadcast:
+    """
+    Um FFmpeg compartilhado e o buffer circular com os últimos frames lidos.
+    Os frames são indexados pela posição na música (em frames de 20ms), então
+    leitores que começaram em momentos ou posições próximas compartilham o buffer.
+    """
+
+    def __init__(self, hub, key, source, start_frame, size):
+        self.hub = hub
+        self.key = key
+        self.source = source
+        self.size = size
+        self.base = start_frame       # Frame mais antigo ainda no buffer
+        self.produced = start_frame   # Próximo frame a ser lido do FFmpeg
+        self.finished = False
+        self.readers = set()
+        self._frames = [None] * size
+        self._lock = threading.Lock()
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def can_join(self, frame):
+        """Indica se um leitor pode começar neste frame (ainda no buffer ou o próximo a sair)"""
+        return not self.finished and self.base <= frame <= self.produced
+
+    def frame(self, index):
+        """
+        Retorna o frame `index`, lendo do FFmpeg se nenhum leitor chegou nele ainda.
+
+        Returns:
+            bytes: O frame (b'' no fim da música) ou None se ele já saiu do buffer
+        """
+        with self._lock:
+            if index < self.base:
+                return None
+            while index >= self.produced:
+                if self.finished:
+                    return b''
+                try:
+                    data = self.source.read()
+                except Exception as e:
+                    logger.warning("Erro na transmissão compartilhada %s: %s", self.key, e)
+                    data = b''
+                if not data:
+                    self.finished = True
+                    return b''
+                self._frames[self.produced % self.size] = data
+                self.produced += 1
+                if self.produced - self.base > self.size:
+                    self.base = self.produced - self.size
+            return self._frames[index % self.size]
+
+
+class BroadcastReader(discord.AudioSource):
+    """
+    Leitor de um servidor em uma transmissão.
+    Pausar não afeta os outros servidores; se o leitor ficar para trás além do
+    buffer, ele passa para outra transmissão (ou abre uma nova) na sua posição.
+    cleanup() (skip, stop, sair do canal) só desliga este leitor.
+    """
+
+    def __init__(self, hub, key, factory, broadcast, frame):
+        self.hub = hub
+        self.key = key
+        self.factory = factory   # Abre o FFmpeg em um frame: factory(frame) -> AudioSource
+        self.broadcast = broadcast
+        self.index = frame
+        self.opus = False
+
+    def is_opus(self):
+        return self.opus
+
+    def read(self):
+        broadcast = self.broadcast
+        if broadcast is None:
+            # Já desligado (ex.: pré-carregamento descartado enquanto lia)
+            return b''
+        data = broadcast.frame(self.index)
+        if data is None:
+            # Ficou para trás (ex.: pausado por mais tempo que o buffer)
+            self.hub.move(self, self.index)
+            if self.broadcast is None:
+                return b''
+            data = self.broadcast.frame(self.index)
+        if data:
+            self.index += 1
+        return data or b''
+
+    def cleanup(self):
+        self.hub.detach(self)
+
+
+class BroadcastHub:
+    """
+    Registro das transmissões ativas por chave (música e variante, ex.: ganho).
+    CPU e banda passam a crescer com as músicas distintas tocando, não com os servidores.
+    """
+
+    def __init__(self, buffer_seconds=10):
+        self.size = max(1, int(buffer_seconds * 1000 / FRAME_MS))
+        self._streams = {}  # chave -> lista de Broadcast (posições diferentes da mesma música)
+        self._lock = threading.Lock()
+
+    def open(self, key, frame, factory):
+        """
+        Cria um leitor começando no frame `frame` da música.
+        Entra em uma transmissão existente se ela ainda tiver o frame no buffer;
+        senão inicia o FFmpeg com factory(frame).
+        """
+        reader = BroadcastReader(self, key, factory, None, frame)
+        self._place(reader, frame)
+        return reader
+
+    def move(self, reader, frame):
+        """Passa um leitor para outra transmissão da mesma música, na posição dele"""
+        self.detach(reader)
+        self._place(reader, frame)
+
+    def _place(self, reader, frame):
+        with self._lock:
+            for broadcast in self._streams.get(reader.key, ()):
+                if broadcast.can_join(frame):
+                    broadcast.readers.add(reader)
+                    reader.broadcast = broadcast
+                    reader.opus = broadcast.is_opus()
+                    BROADCAST_READERS.inc(result='joined')
+                    return
+
+        # Iniciar o FFmpeg fica fora do lock: não segura os outros servidores
+        broadcast = Broadcast(self, reader.key, reader.factory(frame), frame, self.size)
+        broadcast.readers.add(reader)
+        reader.broadcast = broadcast
+        reader.opus = broadcast.is_opus()
+        with self._lock:
+            self._streams.setdefault(reader.key, []).append(broadcast)
+            BROADCASTS_ACTIVE.set(self.active)
+        BROADCAST_READERS.inc(result='started')
+
+    def detach(self, reader):
+        """Remove um leitor; o FFmpeg é finalizado quando a transmissão fica sem leitores"""
+        broadcast = reader.broadcast
+        if broadcast is None:
+            return
+        reader.broadcast = None
+        with self._lock:
+            broadcast.readers.discard(reader)
+            if broadcast.readers:
+                return
+            streams = self._streams.get(broadcast.key)
+            if streams and broadcast in streams:
+                streams.remove(broadcast)
+                if not streams:
+                    del self._streams[broadcast.key]
+            BROADCASTS_ACTIVE.set(self.active)
+        # Espera uma leitura em andamento terminar antes de finalizar o FFmpeg
+        with broadcast._lock:
+            broadcast.source.cleanup()
+
+    @property
+    def active(self):
+        return sum(len(streams) for streams in self._streams.values())
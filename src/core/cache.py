@@ -0,0 +1,334 @@
+"""
+Cache de buscas e metadados do yt-dlp.
+Mantém os resultados em memória (LRU) com persistência em SQLite, para que
+músicas populares não precisem de uma nova busca a cada /music, nem após reiniciar.
+"""
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from ..config.settings import CACHE_SETTINGS
+from ..utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    'amadeus_cache_requests_total', 'Consultas aos caches por resultado', labels=('cache', 'result')
+)
+
+# Extrai o ID de vídeo de URLs do YouTube (watch, youtu.be, shorts, music)
+YOUTUBE_ID_PATTERN = re.compile(
+    r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/)|youtu\.be/)([A-Za-z0-9_-]{11})'
+)
+
+
+# Validade embutida nas URLs do googlevideo (?expire=<unix> ou /expire/<unix>/)
+STREAM_EXPIRE_PATTERN = re.compile(r'[?&/]expire[=/](\d+)')
+
+
+def stream_expiry(url, resolved_at, ttl=CACHE_SETTINGS['stream_url_ttl']):
+    """
+    Retorna quando (time.time) a URL do stream deixa de funcionar.
+    Usa o parâmetro expire da própria URL; sem ele, estima com o TTL configurado.
+    """
+    if not url:
+        return 0
+    match = STREAM_EXPIRE_PATTERN.search(url)
+    if match:
+        return float(match.group(1))
+    return (resolved_at or 0) + ttl
+
+
+def normalize_query(search):
+    """
+    Normaliza uma busca/URL para usar como chave do cache.
+    URLs do YouTube viram "id:<video_id>", buscas em texto viram "q:<texto>".
+    """
+    search = search.strip()
+    match = YOUTUBE_ID_PATTERN.search(search)
+    if match:
+        return f"id:{match.group(1)}"
+    if search.startswith(('http://', 'https://')):
+        return f"url:{search}"
+    return "q:" + " ".join(search.lower().split())
+
+
+class MetadataCache:
+    """
+    Cache em dois níveis: busca normalizada -> ID do vídeo -> metadados.
+    O título/ID não muda, mas a URL do stream expira: ela vale até o expire da
+    própria URL (ou o TTL configurado, se a URL não informar).
+    Consultas e atualizações só mexem na memória; o banco (compartilhado entre
+    os processos de shards) é lido ao iniciar e gravado em lote por uma thread própria.
+    """
+
+    def __init__(self, settings=None):
+        settings = {**CACHE_SETTINGS, **(settings or {})}
+        self.enabled = settings['enabled']
+        self.memory_size = settings['memory_size']
+        self.metadata_ttl = settings['metadata_ttl']
+        self.stream_url_ttl = settings['stream_url_ttl']
+        self.stream_url_margin = settings['stream_url_margin']
+        self.flush_interval = settings['flush_interval']
+
+        self._queries = OrderedDict()  # chave -> video_id
+        self._videos = OrderedDict()   # video_id -> metadados
+        self._loudness = {}            # video_id -> loudness integrada (LUFS); não expira
+        self._dirty_queries = {}       # chave -> (video_id, updated_at) ainda não gravados
+        self._dirty_videos = {}        # video_id -> metadados ainda não gravados
+        self._dirty_loudness = {}      # video_id -> (lufs, measured_at) ainda não gravados
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stream_hits': 0, 'stream_misses': 0}
+        self._task = None
+
+        self._db = None
+        if self.enabled and settings['path']:
+            Path(settings['path']).parent.mkdir(parents=True, exist_ok=True)
+            # Uma única thread grava no banco, fora do event loop
+            self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metadata-cache')
+            self._db = sqlite3.connect(settings['path'], check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript('''
+                CREATE TABLE IF NOT EXISTS queries (
+                    key TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    duration REAL,
+                    webpage_url TEXT,
+                    updated_at REAL NOT NULL,
+                    stream_url TEXT,
+                    stream_updated_at REAL,
+                    stream_codec TEXT
+                );
+                CREATE TABLE IF NOT EXISTS loudness (
+                    video_id TEXT PRIMARY KEY,
+                    lufs REAL NOT NULL,
+                    measured_at REAL NOT NULL
+                );
+            ''')
+            # Bancos criados antes da coluna stream_codec
+            columns = [row[1] for row in self._db.execute('PRAGMA table_info(videos)')]
+            if 'stream_codec' not in columns:
+                self._db.execute('ALTER TABLE videos ADD COLUMN stream_codec TEXT')
+            self._db.commit()
+            self._load()
+
+    def _load(self):
+        """Carrega na memória os itens mais recentes do banco (só ao iniciar)"""
+        oldest = time.time() - self.metadata_ttl
+        # Do mais antigo para o mais novo, para o LRU ficar na ordem certa
+        rows = self._db.execute(
+            'SELECT video_id, title, duration, webpage_url, updated_at, stream_url, stream_updated_at, stream_codec '
+            'FROM (SELECT * FROM videos WHERE updated_at > ? ORDER BY updated_at DESC LIMIT ?) '
+            'ORDER BY updated_at', (oldest, self.memory_size)
+        )
+        for row in rows:
+            self._videos[row[0]] = {
+                'id': row[0],
+                'title': row[1],
+                'duration': row[2],
+                'webpage_url': row[3],
+                'updated_at': row[4],
+                'url': row[5],
+                'stream_updated_at': row[6] or 0,
+                'acodec': row[7]
+            }
+        rows = self._db.execute(
+            'SELECT key, video_id FROM (SELECT * FROM queries WHERE updated_at > ? '
+            'ORDER BY updated_at DESC LIMIT ?) ORDER BY updated_at', (oldest, self.memory_size)
+        )
+        for key, video_id in rows:
+            self._queries[key] = video_id
+        self._loudness = dict(self._db.execute('SELECT video_id, lufs FROM loudness'))
+
+    def start(self):
+        """Inicia a gravação periódica no banco (na primeira atualização)"""
+        if self._db is None or self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Fora do event loop (ex.: scripts): o que faltar é gravado no close()
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Erro ao salvar no cache: %s", e)
+
+    async def flush(self):
+        """Grava em lote as buscas, metadados e loudness alterados"""
+        if self._db is None:
+            return
+        dirty = self._take_dirty()
+        if any(dirty):
+            await asyncio.get_running_loop().run_in_executor(self.writer, self._write, *dirty)
+
+    def _take_dirty(self):
+        with self._lock:
+            queries = [(key, video_id, updated_at) for key, (video_id, updated_at) in self._dirty_queries.items()]
+            videos = [
+                (video['id'], video['title'], video['duration'], video['webpage_url'], video['updated_at'],
+                 video['url'], video['stream_updated_at'], video['acodec'])
+                for video in self._dirty_videos.values()
+            ]
+            loudness = [(video_id, lufs, measured_at) for video_id, (lufs, measured_at) in self._dirty_loudness.items()]
+            self._dirty_queries.clear()
+            self._dirty_videos.clear()
+            self._dirty_loudness.clear()
+        return queries, videos, loudness
+
+    def _write(self, queries, videos, loudness):
+        """Aplica as alterações no banco (roda na thread de escrita)"""
+        self._db.executemany(
+            'INSERT OR REPLACE INTO queries (key, video_id, updated_at) VALUES (?, ?, ?)', queries
+        )
+        self._db.executemany(
+            'INSERT OR REPLACE INTO videos '
+            '(video_id, title, duration, webpage_url, updated_at, stream_url, stream_updated_at, stream_codec) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', videos
+        )
+        self._db.executemany(
+            'INSERT OR REPLACE INTO loudness (video_id, lufs, measured_at) VALUES (?, ?, ?)', loudness
+        )
+        self._db.commit()
+
+    def _remember(self, mapping, key, value):
+        """Insere no LRU em memória, descartando o item menos usado"""
+        mapping[key] = value
+        mapping.move_to_end(key)
+        while len(mapping) > self.memory_size:
+            mapping.popitem(last=False)
+
+    def _load_query(self, key):
+        """Busca o ID do vídeo associado a uma chave"""
+        video_id = self._queries.get(key)
+        if video_id is not None:
+            self._queries.move_to_end(key)
+        return video_id
+
+    def _load_video(self, video_id):
+        """Busca os metadados de um vídeo"""
+        video = self._videos.get(video_id)
+        if video is not None:
+            self._videos.move_to_end(video_id)
+        return video
+
+    def get(self, search):
+        """
+        Retorna os metadados em cache para uma busca/URL.
+
+        Returns:
+            dict: Metadados ('id', 'title', 'duration', 'webpage_url', 'url', 'acodec').
+                  'url' é None se a URL do stream expirou.
+                  Retorna None se não houver nada válido em cache.
+        """
+        if not self.enabled:
+            return None
+        key = normalize_query(search)
+        now = time.time()
+        with self._lock:
+            video_id = key[3:] if key.startswith('id:') else self._load_query(key)
+            video = self._load_video(video_id) if video_id else None
+            if not video or now - video['updated_at'] > self.metadata_ttl:
+                self._stats['misses'] += 1
+                CACHE_REQUESTS.inc(cache='metadata', result='miss')
+                return None
+
+            self._stats['hits'] += 1
+            CACHE_REQUESTS.inc(cache='metadata', result='hit')
+            result = dict(video)
+            if stream_expiry(video['url'], video['stream_updated_at'], self.stream_url_ttl) <= now:
+                self._stats['stream_misses'] += 1
+                CACHE_REQUESTS.inc(cache='stream_url', result='miss')
+                result['url'] = None
+            else:
+                self._stats['stream_hits'] += 1
+                CACHE_REQUESTS.inc(cache='stream_url', result='hit')
+            return result
+
+    def put(self, search, info):
+        """
+        Armazena o resultado de uma extração do yt-dlp.
+
+        Args:
+            search (str): Busca/URL original
+            info (dict): Informações do vídeo retornadas pelo yt-dlp
+        """
+        if not self.enabled or not info or not info.get('id'):
+            return
+        key = normalize_query(search)
+        now = time.time()
+        video = {
+            'id': info['id'],
+            'title': info.get('title', 'Título desconhecido'),
+            'duration': info.get('duration', 0),
+            'webpage_url': info.get('webpage_url') or f"https://www.youtube.com/watch?v={info['id']}",
+            'updated_at': now,
+            'url': info.get('url'),
+            'stream_updated_at': now if info.get('url') else 0,
+            'acodec': info.get('acodec')
+        }
+        with self._lock:
+            self._remember(self._videos, video['id'], video)
+            if not key.startswith('id:'):
+                self._remember(self._queries, key, video['id'])
+            if self._db is not None:
+                self._dirty_videos[video['id']] = video
+                if not key.startswith('id:'):
+                    self._dirty_queries[key] = (video['id'], now)
+        self.start()
+
+    def get_loudness(self, video_id):
+        """
+        Retorna a loudness integrada (LUFS) medida para um vídeo.
+        Não expira com os metadados: o áudio de um vídeo não muda.
+        """
+        if not self.enabled or not video_id:
+            return None
+        with self._lock:
+            return self._loudness.get(video_id)
+
+    def put_loudness(self, video_id, lufs):
+        """Armazena a loudness medida de um vídeo"""
+        if not self.enabled or not video_id:
+            return
+        with self._lock:
+            self._loudness[video_id] = lufs
+            if self._db is not None:
+                self._dirty_loudness[video_id] = (lufs, time.time())
+        self.start()
+
+    def stats(self):
+        """Retorna os contadores de acerto/falha do cache"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['memory_entries'] = len(self._videos)
+        return stats
+
+    def close(self):
+        """Grava o que falta e fecha a conexão com o banco"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._db is not None:
+            self.writer.submit(self._write, *self._take_dirty())
+            self.writer.shutdown(wait=True)
+            self._db.close()
+            self._db = None
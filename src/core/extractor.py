@@ -0,0 +1,344 @@
+"""
+Extração de informações do yt-dlp fora do event loop.
+O yt-dlp é síncrono, então cada extração roda em um pool de threads/processos
+com limites de concorrência global e por servidor, timeout e cancelamento.
+Pedidos simultâneos da mesma música compartilham uma única extração.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse, parse_qs
+import yt_dlp
+from ..config.settings import EXTRACTION_SETTINGS
+from ..utils.metrics import Counter, Histogram
+from .cache import YOUTUBE_ID_PATTERN, normalize_query
+
+EXTRACTION_SECONDS = Histogram(
+    'amadeus_extraction_seconds', 'Duração das extrações do yt-dlp', labels=('outcome',)
+)
+EXTRACTION_WAIT_SECONDS = Histogram(
+    'amadeus_extraction_wait_seconds', 'Espera pelos limites de concorrência antes da extração'
+)
+EXTRACTIONS_COALESCED = Counter(
+    'amadeus_extractions_coalesced_total', 'Pedidos atendidos por uma extração já em andamento'
+)
+
+# Marca o fim de uma playlist na fila entre a thread e o event loop
+_END = object()
+
+
+class ExtractionCancelled(Exception):
+    """Extração cancelada (ex.: o servidor usou /stop durante a busca)"""
+
+
+def _extract_info(ytdl_opts, search):
+    """
+    Executa o yt-dlp de forma síncrona.
+    Roda dentro do pool, então precisa ser uma função de módulo (picklable).
+    """
+    with yt_dlp.YoutubeDL(ytdl_opts) as ydl:
+        info = ydl.extract_info(search, download=False)
+        # sanitize_info deixa o dicionário serializável (necessário no pool de processos)
+        return ydl.sanitize_info(info) if info else None
+
+
+def is_playlist_url(search):
+    """
+    Verifica se a busca é uma URL de playlist (ex.: youtube.com/playlist?list=...).
+    Links de um vídeo aberto dentro de uma playlist ou mix (watch?v=...&list=...,
+    youtu.be/...?list=...) tocam só o vídeo.
+    """
+    if not search.startswith(('http://', 'https://')):
+        return False
+    parsed = urlparse(search)
+    if parsed.path.rstrip('/') == '/playlist':
+        return True
+    return 'list' in parse_qs(parsed.query) and not YOUTUBE_ID_PATTERN.search(search)
+
+
+def _stream_playlist(ytdl_opts, url, push, stop, max_entries):
+    """
+    Lista as entradas de uma playlist sem resolvê-las (extração "flat").
+    O yt-dlp entrega as entradas página por página; cada uma é repassada ao
+    event loop por push() assim que chega. Roda em uma thread do pool.
+    """
+    opts = {**ytdl_opts, 'extract_flat': 'in_playlist', 'noplaylist': False}
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            # URLs com list= fora de /playlist redirecionam para a playlist
+            for _ in range(3):
+                if not info or info.get('entries') is not None or info.get('_type') not in ('url', 'url_transparent'):
+                    break
+                info = ydl.extract_info(info['url'], download=False, process=False)
+
+            count = 0
+            for entry in (info or {}).get('entries') or ():
+                if stop.is_set() or (max_entries and count >= max_entries):
+                    break
+                if not entry or not entry.get('id'):
+                    continue
+                push({
+                    'id': entry['id'],
+                    'title': entry.get('title') or 'Título desconhecido',
+                    'duration': entry.get('duration') or 0,
+                    'webpage_url': entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}"
+                })
+                count += 1
+    except Exception as e:
+        push(e)
+    finally:
+        push(_END)
+
+
+class _GuildSlot:
+    """Estado de concorrência de um servidor"""
+    __slots__ = ('semaphore', 'batch_semaphore', 'pending', 'futures', 'generation')
+
+    def __init__(self, limit, batch_limit):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.batch_semaphore = asyncio.Semaphore(batch_limit)  # Buscas em lote (vários itens de uma vez)
+        self.pending = 0          # Extrações aguardando/rodando
+        self.futures = set()      # Esperas de extrações em andamento
+        self.generation = 0       # Incrementado a cada cancelamento
+
+
+class _Flight:
+    """Extração compartilhada pelos pedidos da mesma busca"""
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0  # Pedidos esperando o resultado
+
+
+class AudioExtractor:
+    """
+    API assíncrona de extração do yt-dlp.
+    Uma busca lenta em um servidor nunca bloqueia o event loop nem as buscas
+    dos outros servidores além do limite global configurado.
+    """
+
+    def __init__(self, settings=None):
+        settings = {**EXTRACTION_SETTINGS, **(settings or {})}
+        self.timeout = settings['timeout']
+        self.per_guild_limit = settings['per_guild_limit']
+        self.batch_limit = settings['batch_limit']
+
+        if settings['executor'] == 'process':
+            self.executor = ProcessPoolExecutor(max_workers=settings['max_workers'])
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=settings['max_workers'],
+                thread_name_prefix='ytdl'
+            )
+
+        self._global_limit = asyncio.Semaphore(settings['global_limit'])
+        self._guilds = {}  # guild_id -> _GuildSlot
+        self._inflight = {}  # busca normalizada -> _Flight da extração em andamento
+
+        # Listagem de playlists (leve, mas longa): pool de threads separado
+        self._playlist_executor = ThreadPoolExecutor(
+            max_workers=settings['max_workers'],
+            thread_name_prefix='ytdl-playlist'
+        )
+        self._playlist_streams = {}  # guild_id -> eventos de parada das playlists em andamento
+
+    def _acquire_guild(self, guild_id):
+        """Retorna o estado do servidor, criando-o se necessário"""
+        slot = self._guilds.get(guild_id)
+        if slot is None:
+            slot = self._guilds[guild_id] = _GuildSlot(self.per_guild_limit, self.batch_limit)
+        slot.pending += 1
+        return slot
+
+    def _release_guild(self, guild_id, slot):
+        """Remove o estado do servidor quando não há mais extrações pendentes"""
+        slot.pending -= 1
+        if slot.pending <= 0 and self._guilds.get(guild_id) is slot:
+            del self._guilds[guild_id]
+
+    async def extract(self, search, ytdl_opts, guild_id=None, timeout=None, batch=False):
+        """
+        Extrai as informações de uma busca/URL sem bloquear o event loop.
+        Pedidos simultâneos da mesma busca (normalizada) ou do mesmo vídeo,
+        de qualquer servidor, aguardam a mesma extração. A extração compartilhada
+        só ocupa o limite global; o limite por servidor, o timeout e o
+        cancelamento valem para cada pedido. Se a extração compartilhada falhar
+        por timeout ou for abandonada, quem ainda tem tempo tenta de novo.
+
+        Args:
+            search (str): URL ou busca (ex.: "ytsearch:...")
+            ytdl_opts (dict): Opções do yt-dlp
+            guild_id (int): Servidor que fez o pedido (para o limite por servidor)
+            timeout (float): Sobrescreve o timeout padrão
+            batch (bool): Busca de um lote; usa o limite 'batch_limit' do servidor,
+                          separado do limite das buscas individuais
+
+        Returns:
+            dict: Informações retornadas pelo yt-dlp (ou None); pedidos coalescidos
+                  recebem o mesmo dicionário, que não deve ser alterado
+
+        Raises:
+            asyncio.TimeoutError: Se a extração passar do tempo limite
+            ExtractionCancelled: Se a extração for cancelada via cancel_guild
+        """
+        timeout = self.timeout if timeout is None else timeout
+        key = normalize_query(search)
+        loop = asyncio.get_running_loop()
+        slot = self._acquire_guild(guild_id)
+        generation = slot.generation
+        try:
+            semaphore = slot.batch_semaphore if batch else slot.semaphore
+            async with semaphore:
+                # Cancelada enquanto esperava na fila do semáforo
+                if slot.generation != generation:
+                    raise ExtractionCancelled("Busca cancelada.")
+                deadline = loop.time() + timeout
+                while True:
+                    flight = self._join(key, search, ytdl_opts)
+                    # shield: cancelar a espera de um pedido não cancela a extração dos outros
+                    waiter = asyncio.shield(flight.task)
+                    slot.futures.add(waiter)
+                    try:
+                        return await asyncio.wait_for(waiter, timeout=deadline - loop.time())
+                    except asyncio.CancelledError:
+                        if asyncio.current_task().cancelling():
+                            raise
+                        if slot.generation != generation:
+                            # A espera deste servidor foi cancelada (cancel_guild)
+                            raise ExtractionCancelled("Busca cancelada.")
+                        # A extração compartilhada foi abandonada: tenta de novo
+                    except asyncio.TimeoutError:
+                        # Timeout da extração compartilhada, não deste pedido: tenta de novo
+                        if not flight.task.done() or loop.time() >= deadline:
+                            raise
+                    finally:
+                        slot.futures.discard(waiter)
+                        self._leave(key, flight)
+        finally:
+            self._release_guild(guild_id, slot)
+
+    def _join(self, key, search, ytdl_opts):
+        """Entra na extração em andamento da busca, iniciando uma se não houver"""
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.get_running_loop().create_task(self._extract(search, ytdl_opts))
+            flight = self._inflight[key] = _Flight(task)
+            task.add_done_callback(lambda task, key=key, flight=flight: self._land(key, flight))
+        else:
+            EXTRACTIONS_COALESCED.inc()
+        flight.waiters += 1
+        return flight
+
+    def _leave(self, key, flight):
+        """Sai de uma extração; sem ninguém esperando, ela é abandonada"""
+        flight.waiters -= 1
+        if flight.waiters <= 0 and not flight.task.done():
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            flight.task.cancel()
+
+    def _land(self, key, flight):
+        """Tira a extração terminada da lista de extrações em andamento"""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # Marca a exceção como lida mesmo se ninguém mais estiver esperando
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def _extract(self, search, ytdl_opts):
+        """Executa uma extração compartilhada respeitando só o limite global"""
+        queued_at = time.perf_counter()
+        await self._global_limit.acquire()
+        started_at = time.perf_counter()
+        EXTRACTION_WAIT_SECONDS.observe(started_at - queued_at)
+        loop = asyncio.get_running_loop()
+        try:
+            work = self.executor.submit(_extract_info, ytdl_opts, search)
+        except BaseException:
+            self._global_limit.release()
+            raise
+        # O trabalho no pool não é interrompido por timeout/cancelamento:
+        # a vaga global só é devolvida quando ele termina de fato
+        work.add_done_callback(lambda _: self._release_global(loop))
+        outcome = 'error'
+        try:
+            info = await asyncio.wait_for(asyncio.wrap_future(work, loop=loop), timeout=self.timeout)
+            outcome = 'ok'
+            return info
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        finally:
+            EXTRACTION_SECONDS.observe(time.perf_counter() - started_at, outcome=outcome)
+
+    def _release_global(self, loop):
+        """Devolve a vaga global quando um trabalho do pool termina (chamado na thread do pool)"""
+        try:
+            loop.call_soon_threadsafe(self._global_limit.release)
+        except RuntimeError:
+            # Event loop já encerrado
+            pass
+
+    async def iter_playlist(self, url, ytdl_opts, guild_id=None, max_entries=None):
+        """
+        Itera as entradas de uma playlist conforme o yt-dlp as lista.
+        Cada entrada tem só 'id', 'title', 'duration' e 'webpage_url';
+        a URL do stream deve ser resolvida quando a música estiver perto de tocar.
+
+        Raises:
+            asyncio.TimeoutError: Se a próxima página demorar mais que o timeout
+        """
+        loop = asyncio.get_running_loop()
+        entries = asyncio.Queue()
+        stop = threading.Event()
+        streams = self._playlist_streams.setdefault(guild_id, set())
+        streams.add(stop)
+
+        def push(item):
+            loop.call_soon_threadsafe(entries.put_nowait, item)
+
+        loop.run_in_executor(self._playlist_executor, _stream_playlist, ytdl_opts, url, push, stop, max_entries)
+        try:
+            while True:
+                item = await asyncio.wait_for(entries.get(), timeout=self.timeout)
+                if item is _END:
+                    return
+                if stop.is_set():
+                    raise ExtractionCancelled("Playlist cancelada.")
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            streams.discard(stop)
+            if not streams:
+                self._playlist_streams.pop(guild_id, None)
+
+    def cancel_guild(self, guild_id):
+        """
+        Cancela as extrações pendentes e em andamento de um servidor.
+        Só as esperas do servidor são canceladas: extrações compartilhadas
+        continuam para os outros servidores e são abandonadas quando ninguém mais
+        espera. Trabalhos que já estão rodando no pool terminam em segundo plano;
+        o limite do servidor é liberado imediatamente, mas a vaga global só
+        quando o trabalho termina no pool.
+        """
+        for stop in self._playlist_streams.get(guild_id, ()):
+            stop.set()
+        slot = self._guilds.get(guild_id)
+        if slot is None:
+            return
+        slot.generation += 1
+        for future in list(slot.futures):
+            future.cancel()
+
+    def close(self):
+        """Encerra os pools de extração"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._playlist_executor.shutdown(wait=False, cancel_futures=True)
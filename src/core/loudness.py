@@ -0,0 +1,147 @@
+"""
+Análise de loudness para normalizar o volume entre músicas.
+A loudness integrada (EBU R128) de cada vídeo é medida uma única vez, em
+segundo plano, e guardada no cache de metadados; ao tocar, basta um filtro
+de ganho fixo (volume=XdB) no FFmpeg, sem o loudnorm em duas passadas.
+"""
+import asyncio
+import json
+import logging
+import re
+from ..config.settings import LOUDNESS_SETTINGS
+from ..utils.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOUDNESS_ANALYSES = Counter(
+    'amadeus_loudness_analyses_total', 'Análises de loudness por resultado', labels=('result',)
+)
+LOUDNESS_ANALYSIS_SECONDS = Histogram(
+    'amadeus_loudness_analysis_seconds', 'Duração das análises de loudness',
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+
+# Bloco JSON impresso pelo loudnorm no fim da análise
+LOUDNORM_JSON_PATTERN = re.compile(r'\{[^{}]*"input_i"[^{}]*\}')
+
+
+def parse_loudnorm(output):
+    """
+    Extrai a loudness integrada (LUFS) da saída do filtro loudnorm.
+
+    Returns:
+        float: Loudness integrada, ou None se não foi possível medir (ex.: silêncio)
+    """
+    match = LOUDNORM_JSON_PATTERN.search(output)
+    if not match:
+        return None
+    try:
+        lufs = float(json.loads(match.group(0))['input_i'])
+    except (ValueError, KeyError):
+        return None
+    # -inf/-70 LUFS: silêncio, não há o que normalizar
+    return lufs if lufs > -70 else None
+
+
+class LoudnessAnalyzer:
+    """
+    Mede a loudness das músicas com o FFmpeg (um processo por análise,
+    limitado por `concurrency`) e converte o valor salvo em ganho.
+    schedule() é barato: ignora músicas já medidas ou em análise.
+    """
+
+    def __init__(self, ffmpeg_path, cache, settings=None):
+        settings = {**LOUDNESS_SETTINGS, **(settings or {})}
+        self.enabled = settings['enabled']
+        self.target = settings['target']
+        self.min_gain = settings['min_gain']
+        self.max_gain = settings['max_gain']
+        self.max_seconds = settings['max_seconds']
+        self.timeout = settings['timeout']
+        self.transcode_passthrough = settings['transcode_passthrough']
+        self.ffmpeg_path = ffmpeg_path
+        self.cache = cache
+
+        self._limit = asyncio.Semaphore(settings['concurrency'])
+        self._pending = {}  # video_id -> task da análise
+
+    def gain(self, video_id):
+        """
+        Ganho (dB) a aplicar em uma música, a partir da loudness salva.
+
+        Returns:
+            float: Ganho limitado a ±max_gain, ou 0 se não medida ou pequeno demais
+        """
+        if not self.enabled:
+            return 0
+        lufs = self.cache.get_loudness(video_id)
+        if lufs is None:
+            return 0
+        gain = max(-self.max_gain, min(self.max_gain, self.target - lufs))
+        return gain if abs(gain) >= self.min_gain else 0
+
+    def schedule(self, video_id, source, local=False):
+        """
+        Agenda a medição de um vídeo a partir de uma URL de stream ou arquivo local.
+        Não faz nada se já houver medida salva ou uma análise em andamento.
+        """
+        if (not self.enabled or not video_id or not source or video_id in self._pending
+                or self.cache.get_loudness(video_id) is not None):
+            return
+        task = asyncio.get_running_loop().create_task(self._analyze(video_id, source, local))
+        self._pending[video_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(video_id, None))
+
+    async def _analyze(self, video_id, source, local):
+        async with self._limit:
+            try:
+                with LOUDNESS_ANALYSIS_SECONDS.time():
+                    lufs = await self.measure(source, local)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOUDNESS_ANALYSES.inc(result='error')
+                logger.debug("Erro ao medir loudness de %s: %s", video_id, e)
+                return
+        if lufs is None:
+            LOUDNESS_ANALYSES.inc(result='unmeasurable')
+            return
+        LOUDNESS_ANALYSES.inc(result='measured')
+        self.cache.put_loudness(video_id, lufs)
+        logger.debug("Loudness de %s: %.1f LUFS", video_id, lufs)
+
+    async def measure(self, source, local=False):
+        """
+        Roda o FFmpeg com o loudnorm em modo de análise (sem gerar áudio).
+        Decodifica no máximo `max_seconds` e desiste após `timeout`.
+        """
+        args = [str(self.ffmpeg_path), '-hide_banner', '-nostats']
+        if not local:
+            args += ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+        args += ['-i', source, '-vn', '-sn', '-dn']
+        if self.max_seconds:
+            args += ['-t', str(self.max_seconds)]
+        args += ['-af', 'loudnorm=print_format=json', '-f', 'null', '-']
+
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except BaseException:
+            # Timeout ou cancelamento: não deixa o FFmpeg rodando sozinho
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0:
+            return None
+        return parse_loudnorm(stderr.decode(errors='replace'))
+
+    def close(self):
+        """Cancela as análises em andamento"""
+        for task in list(self._pending.values()):
+            task.cancel()
+        self._pending.clear()
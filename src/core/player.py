@@ -0,0 +1,123 @@
+"""
+Estado de reprodução por servidor.
+Cada servidor tem um GuildPlayer com a fila, a votação de skip e as tasks em
+segundo plano; o objeto é descartado quando o bot sai do canal de voz.
+"""
+import time
+from collections import deque
+from .cache import stream_expiry
+
+
+class Track:
+    """
+    Entrada da fila de músicas.
+    Usa __slots__ para manter o custo por música baixo em filas longas.
+    O ID do vídeo é o que identifica a música; a URL do stream é descartável
+    e só é resolvida (ou renovada) quando a música está perto de tocar.
+    """
+    __slots__ = ('id', 'title', 'duration', 'webpage_url', 'url', 'resolved_at', 'acodec', 'expires_at')
+
+    def __init__(self, id, title, duration=0, webpage_url=None, url=None, resolved_at=0, acodec=None,
+                 expires_at=0):
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.webpage_url = webpage_url or (f"https://www.youtube.com/watch?v={id}" if id else None)
+        self.url = url                  # URL do stream (None até ser resolvida)
+        self.resolved_at = resolved_at  # Quando a URL do stream foi obtida
+        self.acodec = acodec
+        # Validade da URL (filas salvas antes deste campo calculam a partir da URL)
+        self.expires_at = expires_at or stream_expiry(url, resolved_at)
+
+    def set_stream(self, url, acodec=None, resolved_at=None):
+        """Troca a URL do stream (None descarta a atual) e recalcula a validade"""
+        self.url = url
+        self.acodec = acodec
+        self.resolved_at = (resolved_at or time.time()) if url else 0
+        self.expires_at = stream_expiry(url, self.resolved_at)
+
+    @classmethod
+    def from_info(cls, info, webpage_url=None):
+        """
+        Cria uma entrada a partir das informações do yt-dlp (ou do cache).
+        Entradas sem 'url' (ex.: de playlists) são resolvidas perto de tocar.
+        """
+        url = info.get('url')
+        return cls(
+            id=info.get('id'),
+            title=info.get('title') or 'Título desconhecido',
+            duration=info.get('duration') or 0,
+            webpage_url=info.get('webpage_url') or webpage_url,
+            url=url,
+            resolved_at=(info.get('stream_updated_at') or time.time()) if url else 0,
+            acodec=info.get('acodec')
+        )
+
+    def to_row(self):
+        """Serializa a entrada em uma lista compacta (na ordem do construtor)"""
+        return [self.id, self.title, self.duration, self.webpage_url, self.url, self.resolved_at, self.acodec,
+                self.expires_at]
+
+    def __repr__(self):
+        return f"<Track id={self.id!r} title={self.title!r}>"
+
+
+class GuildPlayer:
+    """
+    Fila, votação de skip e tasks em segundo plano de um servidor.
+    Substitui os vários dicionários paralelos indexados por guild_id.
+    """
+    __slots__ = (
+        'guild_id', 'queue', 'text_channel', 'skip_votes', 'skip_in_progress', 'skip_message',
+        'skip_required', 'now_playing', 'prefetch', 'source', 'gapless', 'playlist_tasks', 'starting', 'started_at', 'resume_at',
+        'ended_at', 'retries'
+    )
+
+    def __init__(self, guild_id, text_channel=None):
+        self.guild_id = guild_id
+        self.queue = deque()
+        self.text_channel = text_channel
+        self.skip_votes = set()
+        self.skip_in_progress = False
+        self.skip_message = None     # Mensagem da votação de skip (recebe as reações)
+        self.skip_required = 0       # Votos necessários para pular
+        self.now_playing = None      # Último aviso de "Tocando agora" (editado na próxima música)
+        self.prefetch = None         # (Track, task) da resolução da próxima música
+        self.source = None           # Fonte ativa (conta os frames tocados da música atual)
+        self.gapless = None          # GaplessAudioSource ativo
+        self.playlist_tasks = set()  # Cargas de playlist em andamento
+        self.starting = False        # Reprodução sendo iniciada
+        self.started_at = 0          # Quando a música atual começou (time.time, descontado o início)
+        self.resume_at = 0           # Posição (segundos) para a próxima música começar
+        self.ended_at = 0            # Fim da última música (perf_counter), para medir a troca
+        self.retries = 0             # Retomadas da música atual após falhas do stream
+
+    def reset_skip_vote(self):
+        """Finaliza a votação de skip atual"""
+        self.skip_in_progress = False
+        self.skip_votes = set()
+        self.skip_message = None
+        self.skip_required = 0
+
+    def cancel_prefetch(self):
+        """Cancela o pré-carregamento pendente"""
+        if self.prefetch:
+            self.prefetch[1].cancel()
+            self.prefetch = None
+
+    def cancel_playlists(self):
+        """Interrompe a carga das playlists em andamento"""
+        for task in self.playlist_tasks:
+            task.cancel()
+        self.playlist_tasks.clear()
+
+    def teardown(self):
+        """Cancela tudo que o servidor tem em andamento e esvazia a fila"""
+        self.cancel_playlists()
+        self.cancel_prefetch()
+        self.source = None
+        self.gapless = None
+        self.queue.clear()
+        self.resume_at = 0
+        self.retries = 0
+        self.reset_skip_vote()
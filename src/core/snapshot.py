@@ -0,0 +1,160 @@
+"""
+Snapshot das filas de música para retomar a reprodução após reiniciar.
+Cada servidor é uma linha em SQLite com a fila compactada (JSON + zlib),
+o canal de texto/voz e a posição da música atual. Só os servidores que
+mudaram são regravados, em uma thread, fora do event loop.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from ..config.settings import SNAPSHOT_SETTINGS
+from .player import Track
+
+logger = logging.getLogger(__name__)
+
+
+class SavedSession:
+    """Estado salvo de um servidor (a fila só é descompactada ao restaurar)"""
+    __slots__ = ('guild_id', 'voice_channel_id', 'text_channel_id', 'position', 'tracks_blob')
+
+    def __init__(self, guild_id, voice_channel_id, text_channel_id, position, tracks_blob):
+        self.guild_id = guild_id
+        self.voice_channel_id = voice_channel_id
+        self.text_channel_id = text_channel_id
+        self.position = position
+        self.tracks_blob = tracks_blob
+
+    def tracks(self):
+        """Descompacta a fila salva"""
+        return [Track(*row) for row in json.loads(zlib.decompress(self.tracks_blob))]
+
+
+class QueueSnapshot:
+    """
+    Checkpoint incremental das filas por servidor.
+    mark()/forget() só anotam o servidor (O(1), no caminho da reprodução);
+    a gravação acontece a cada `interval` segundos em uma thread própria.
+    """
+
+    def __init__(self, settings=None):
+        settings = {**SNAPSHOT_SETTINGS, **(settings or {})}
+        self.enabled = settings['enabled'] and bool(settings['path'])
+        self.interval = settings['interval']
+        self.max_age = settings['max_age']
+
+        self._dirty = set()    # Servidores com a fila alterada
+        self._deleted = set()  # Servidores a remover do snapshot
+        self._task = None
+        self._db = None
+        if not self.enabled:
+            return
+
+        Path(settings['path']).parent.mkdir(parents=True, exist_ok=True)
+        # Uma única thread grava no banco, então as gravações nunca se sobrepõem
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot')
+        self._db = sqlite3.connect(settings['path'], check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                guild_id INTEGER PRIMARY KEY,
+                voice_channel_id INTEGER,
+                text_channel_id INTEGER,
+                position REAL NOT NULL,
+                tracks BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._db.commit()
+
+    def mark(self, guild_id):
+        """Anota que a fila de um servidor mudou"""
+        if self.enabled:
+            self._dirty.add(guild_id)
+            self._deleted.discard(guild_id)
+
+    def forget(self, guild_id):
+        """Anota que o servidor não deve mais ser retomado"""
+        if self.enabled:
+            self._dirty.discard(guild_id)
+            self._deleted.add(guild_id)
+
+    def load(self):
+        """
+        Lê as sessões salvas (sem descompactar as filas).
+
+        Returns:
+            dict: guild_id -> SavedSession
+        """
+        if not self.enabled:
+            return {}
+        rows = self._db.execute(
+            'SELECT guild_id, voice_channel_id, text_channel_id, position, tracks FROM sessions '
+            'WHERE updated_at >= ?', (time.time() - self.max_age,)
+        ).fetchall()
+        return {row[0]: SavedSession(*row) for row in rows}
+
+    def start(self, collect):
+        """
+        Inicia os checkpoints periódicos.
+
+        Args:
+            collect: Função chamada no event loop com os servidores alterados;
+                     retorna (sessões, posições) — sessões: guild_id -> (voz, texto,
+                     posição, linhas das músicas); posições: guild_id -> posição
+        """
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(collect))
+
+    async def _run(self, collect):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.checkpoint(collect)
+            except Exception as e:
+                logger.error("Erro ao salvar snapshot das filas: %s", e)
+
+    async def checkpoint(self, collect):
+        """Grava os servidores alterados e atualiza a posição dos que estão tocando"""
+        dirty, self._dirty = self._dirty, set()
+        deleted, self._deleted = self._deleted, set()
+        sessions, positions = collect(dirty)
+        if not sessions and not positions and not deleted:
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._write, sessions, positions, deleted
+        )
+
+    def _write(self, sessions, positions, deleted):
+        """Grava o checkpoint no banco (roda na thread do snapshot)"""
+        now = time.time()
+        rows = []
+        for guild_id, (voice_channel_id, text_channel_id, position, tracks) in sessions.items():
+            blob = zlib.compress(json.dumps(tracks, separators=(',', ':')).encode())
+            rows.append((guild_id, voice_channel_id, text_channel_id, position, blob, now))
+        self._db.executemany(
+            'INSERT OR REPLACE INTO sessions '
+            '(guild_id, voice_channel_id, text_channel_id, position, tracks, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows
+        )
+        self._db.executemany(
+            'UPDATE sessions SET position = ?, updated_at = ? WHERE guild_id = ?',
+            [(position, now, guild_id) for guild_id, position in positions.items()]
+        )
+        self._db.executemany('DELETE FROM sessions WHERE guild_id = ?', [(g,) for g in deleted])
+        self._db.commit()
+
+    def close(self):
+        """Para os checkpoints e fecha o banco"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._db is not None:
+            self.executor.shutdown(wait=True)
+            self._db.close()
+            self._db = None
@@ -0,0 +1,238 @@
+"""
+Fontes de áudio customizadas para o discord.py.
+"""
+import threading
+from array import array
+from collections import deque
+import discord
+
+# Cada leitura do discord.py corresponde a 20ms de áudio
+FRAME_MS = 20
+
+
+class CountingAudioSource(discord.AudioSource):
+    """
+    Envolve uma fonte contando os frames entregues ao player.
+    A contagem dá a posição real da música (pausas não contam) e `exhausted`
+    diferencia o fim do stream (o FFmpeg parou de entregar áudio) de um stop().
+    """
+
+    def __init__(self, source, song, start_frames=0):
+        self.current = source
+        self.song = song
+        self.frames_played = start_frames
+        self.exhausted = False
+
+    def is_opus(self):
+        return self.current.is_opus()
+
+    def read(self):
+        frame = self.current.read()
+        if frame:
+            self.frames_played += 1
+        else:
+            self.exhausted = True
+        return frame
+
+    def cleanup(self):
+        self.current.cleanup()
+
+
+class PreloadedTrack:
+    """
+    Próxima música já com o FFmpeg iniciado.
+    Uma thread lê os primeiros frames para que a troca não espere a conexão.
+    """
+
+    def __init__(self, source, song, prebuffer_frames):
+        self.source = source
+        self.song = song
+        self.frames_read = 0
+        self._frames = deque()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._fill, args=(prebuffer_frames,), daemon=True, name='audio-prebuffer'
+        )
+        self._thread.start()
+
+    def _fill(self, count):
+        """Lê os primeiros frames do FFmpeg (roda em uma thread separada)"""
+        for _ in range(count):
+            if self._stop.is_set():
+                return
+            frame = self.source.read()
+            self._frames.append(frame)
+            if not frame:
+                return
+
+    def read(self):
+        """Lê o próximo frame: primeiro os pré-carregados, depois direto do FFmpeg"""
+        self.frames_read += 1
+        if self._thread.is_alive():
+            if self._frames:
+                return self._frames.popleft()
+            # A thread ainda está conectando: espera ela terminar antes de ler junto
+            self._stop.set()
+            self._thread.join()
+        if self._frames:
+            return self._frames.popleft()
+        return self.source.read()
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self._stop.set()
+        self.source.cleanup()
+
+
+class GaplessAudioSource(discord.AudioSource):
+    """
+    Fonte que troca de música sem pausa.
+    O FFmpeg da próxima música é iniciado alguns segundos antes do fim da atual
+    (via on_need_next) e a troca acontece dentro do próprio player do discord.py,
+    com crossfade opcional.
+
+    As músicas podem ser PCM ou Opus (passthrough): o player do discord.py
+    consulta is_opus() a cada frame, então a troca entre os dois tipos funciona.
+
+    Os callbacks rodam na thread do player, então precisam ser rápidos
+    (normalmente só agendam algo no event loop).
+    """
+
+    def __init__(self, source, song, on_need_next=None, on_switch=None,
+                 preload_seconds=5, prebuffer_frames=50, crossfade=0):
+        self.current = source
+        self.song = song
+        self.on_need_next = on_need_next
+        self.on_switch = on_switch
+        self.preload_frames = int(preload_seconds * 1000 / FRAME_MS)
+        self.prebuffer_frames = prebuffer_frames
+        self.crossfade_frames = int(crossfade * 1000 / FRAME_MS)
+
+        self.frames_played = 0
+        self.exhausted = False  # A última música acabou sem próxima pronta (fim do stream)
+        self._next = None
+        self._need_next_sent = False
+        self._advance = False
+        self._lock = threading.Lock()
+
+    def is_opus(self):
+        return self.current.is_opus()
+
+    @property
+    def remaining_frames(self):
+        """Frames que faltam na música atual (estimado pela duração do yt-dlp)"""
+        duration = self.song.duration or 0
+        if not duration:
+            return None
+        return int(duration * 1000 / FRAME_MS) - self.frames_played
+
+    def wants_next(self):
+        """Indica se a música atual já está perto do fim e ainda não há próxima pronta"""
+        remaining = self.remaining_frames
+        return self._next is None and remaining is not None and remaining <= self.preload_frames
+
+    def set_next(self, source, song):
+        """Define a próxima música (o FFmpeg já deve ter sido iniciado)"""
+        preloaded = PreloadedTrack(source, song, self.prebuffer_frames)
+        with self._lock:
+            old, self._next = self._next, preloaded
+        if old is not None:
+            old.cleanup()
+
+    def clear_next(self):
+        """Descarta a próxima música pré-carregada (ex.: a fila mudou)"""
+        with self._lock:
+            old, self._next = self._next, None
+            self._need_next_sent = False
+        if old is not None:
+            old.cleanup()
+
+    def advance(self):
+        """
+        Pula para a próxima música pré-carregada no próximo frame.
+        Retorna False se não houver próxima pronta.
+        """
+        with self._lock:
+            if self._next is None:
+                return False
+            self._advance = True
+            return True
+
+    def _switch(self):
+        """Troca para a próxima música (chamado com o lock adquirido)"""
+        old = self.current
+        self.current, self.song = self._next, self._next.song
+        self._next = None
+        # Durante o crossfade a próxima música já começou a tocar
+        self.frames_played = self.current.frames_read
+        self._need_next_sent = False
+        self._advance = False
+        old.cleanup()
+        if self.on_switch:
+            self.on_switch(self.song)
+
+    def _mix(self, current, upcoming, position):
+        """Mistura dois frames PCM com ganho linear (crossfade)"""
+        if not upcoming:
+            return current
+        if not current:
+            return upcoming
+        fade = position / self.crossfade_frames
+        a = array('h', current)
+        b = array('h', upcoming)
+        mixed = array('h', (
+            max(-32768, min(32767, int(x * (1 - fade) + y * fade)))
+            for x, y in zip(a, b)
+        ))
+        return mixed.tobytes()
+
+    def read(self):
+        with self._lock:
+            remaining = self.remaining_frames
+
+            # Pede a próxima música alguns segundos antes do fim
+            if (not self._need_next_sent and self._next is None and remaining is not None
+                    and remaining <= self.preload_frames and self.on_need_next):
+                self._need_next_sent = True
+                self.on_need_next(self.song)
+
+            if self._advance and self._next is not None:
+                self._switch()
+                self.frames_played += 1
+                return self.current.read()
+
+            # Crossfade: começa a ler a próxima música antes da atual terminar
+            # (só é possível misturar quando as duas fontes são PCM)
+            if (self.crossfade_frames and self._next is not None and remaining is not None
+                    and remaining <= self.crossfade_frames
+                    and not self.current.is_opus() and not self._next.is_opus()):
+                frame = self.current.read() if remaining > 0 else b''
+                upcoming = self._next.read()
+                self.frames_played += 1
+                if not frame:
+                    # Fim do crossfade (ou a música atual acabou antes do previsto)
+                    self._switch()
+                    return upcoming
+                return self._mix(frame, upcoming, self.crossfade_frames - remaining)
+
+            frame = self.current.read()
+            self.frames_played += 1
+            if frame:
+                return frame
+
+            # Música atual acabou: troca sem pausa se a próxima estiver pronta
+            if self._next is not None:
+                self._switch()
+                self.frames_played += 1
+                return self.current.read()
+            self.exhausted = True
+            return b''
+
+    def cleanup(self):
+        with self._lock:
+            self.current.cleanup()
+            if self._next is not None:
+                self._next.cleanup()
+                self._next = None
@@ -0,0 +1,71 @@
+"""
+Coalescedor de edições de mensagens.
+Mensagens que mudam com frequência (votação de skip, "tocando agora") não
+são editadas a cada evento: só o conteúdo mais recente de cada mensagem fica
+pendente e ela é editada no máximo uma vez a cada `interval` segundos.
+"""
+import asyncio
+import logging
+import discord
+from ..config.settings import MESSAGE_EDIT_SETTINGS
+from .scheduler import TimerHeap
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_EDITS = Counter(
+    'amadeus_message_edits_total', 'Edições de mensagens pedidas e enviadas', labels=('result',)
+)
+
+
+class MessageEditor:
+    """
+    Edita mensagens com debounce por mensagem e limite global de concorrência.
+    edit() é O(1): se já existe uma edição agendada, só troca o conteúdo pendente.
+    """
+
+    def __init__(self, settings=None):
+        settings = {**MESSAGE_EDIT_SETTINGS, **(settings or {})}
+        self.interval = settings['interval']
+        self.retry_delay = settings['retry_delay']
+        self._pending = {}           # message.id -> (mensagem, conteúdo mais recente)
+        self._timers = TimerHeap()   # Próxima edição permitida de cada mensagem
+        self._limit = asyncio.Semaphore(settings['concurrency'])
+
+    def edit(self, message, content):
+        """Agenda a edição; conteúdos anteriores ainda não enviados são descartados"""
+        if message.id in self._pending:
+            MESSAGE_EDITS.inc(result='coalesced')
+        self._pending[message.id] = (message, content)
+        # Com um timer armado (edição recente ou já agendada), ele envia o conteúdo novo
+        if message.id not in self._timers:
+            self._timers.schedule(message.id, 0, lambda: self._flush(message.id))
+
+    def discard(self, message_id):
+        """Descarta a edição pendente (ex.: a mensagem foi apagada)"""
+        self._pending.pop(message_id, None)
+
+    async def _flush(self, message_id):
+        pending = self._pending.pop(message_id, None)
+        if pending is None:
+            return
+        # Janela até a próxima edição: o que chegar nesse meio tempo sai junto no fim dela
+        self._timers.schedule(message_id, self.interval, lambda: self._flush(message_id))
+        message, content = pending
+        async with self._limit:
+            try:
+                await message.edit(content=content)
+                MESSAGE_EDITS.inc(result='sent')
+            except discord.NotFound:
+                self.discard(message_id)
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    logger.debug("Erro ao editar mensagem %s: %s", message_id, e)
+                    return
+                # Limitado pelo Discord: guarda o conteúdo (se não veio um mais novo) e espera mais
+                self._pending.setdefault(message_id, pending)
+                self._timers.schedule(message_id, self.retry_delay, lambda: self._flush(message_id))
+
+    def close(self):
+        self._pending.clear()
+        self._timers.close()
@@ -0,0 +1,232 @@
+"""
+Agendador central de mensagens temporárias.
+Em vez de uma task dormindo por mensagem, as mensagens a apagar ficam
+agrupadas por canal e um único TimerHeap acorda no vencimento mais próximo.
+As mensagens vencidas de um canal são apagadas juntas (bulk delete quando
+possível) e as pendentes ficam em SQLite para sobreviver a reinícios.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import discord
+from ..config.settings import MESSAGE_EXPIRY_SETTINGS
+from .scheduler import TimerHeap
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_DELETED = Counter(
+    'amadeus_expired_messages_total', 'Mensagens temporárias apagadas por método', labels=('method',)
+)
+
+# O Discord só apaga em lote mensagens com menos de 14 dias (com folga)
+BULK_MAX_AGE = 14 * 24 * 3600 - 3600
+BULK_MAX_SIZE = 100
+
+
+class MessageExpiry:
+    """
+    Apaga mensagens após um tempo, agrupadas por canal.
+    schedule() é O(1) mais um O(log n) no heap quando o canal ganha um
+    vencimento mais próximo; a gravação no banco é feita em lote, em uma thread.
+    """
+
+    def __init__(self, bot, settings=None):
+        settings = {**MESSAGE_EXPIRY_SETTINGS, **(settings or {})}
+        self.bot = bot
+        self.batch_window = settings['batch_window']
+        self.persist_interval = settings['persist_interval']
+        self.retry_delay = settings['retry_delay']
+
+        self._channels = {}            # channel_id -> {message_id: vencimento (time.time)}
+        self._timers = TimerHeap()     # Um timer por canal, no vencimento mais próximo
+        self._limit = asyncio.Semaphore(settings['concurrency'])
+        self._no_bulk = set()          # Canais sem permissão para apagar em lote
+        self._added = {}               # Alterações ainda não gravadas: message_id -> (canal, vencimento)
+        self._removed = set()
+        self._task = None
+        self._db = None
+        if not settings['path']:
+            return
+
+        Path(settings['path']).parent.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='expiry')
+        self._db = sqlite3.connect(settings['path'], check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS expiring (
+                message_id INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        self._db.commit()
+
+    def schedule(self, message, delay):
+        """Agenda a remoção de uma mensagem (reagendar substitui o prazo anterior)"""
+        self.schedule_ids(message.channel.id, message.id, delay)
+
+    def schedule_ids(self, channel_id, message_id, delay):
+        expires_at = time.time() + delay
+        pending = self._channels.setdefault(channel_id, {})
+        pending[message_id] = expires_at
+        if self._db is not None:
+            self._added[message_id] = (channel_id, expires_at)
+            self._removed.discard(message_id)
+        self._arm(channel_id, expires_at)
+
+    def cancel(self, channel_id, message_id):
+        """Desiste de apagar uma mensagem (ex.: já foi apagada por outro caminho)"""
+        pending = self._channels.get(channel_id)
+        if pending and pending.pop(message_id, None) is not None:
+            self._forget(message_id)
+            if not pending:
+                del self._channels[channel_id]
+                self._timers.cancel(channel_id)
+
+    def __len__(self):
+        return sum(len(pending) for pending in self._channels.values())
+
+    def _arm(self, channel_id, expires_at):
+        """Arma o timer do canal se este vencimento for o mais próximo"""
+        deadline = self._timers.deadline(channel_id)
+        delay = max(0.0, expires_at - time.time())
+        if deadline is None or time.monotonic() + delay < deadline:
+            self._timers.schedule(channel_id, delay, lambda: self._flush(channel_id))
+
+    def _forget(self, message_id):
+        if self._db is not None:
+            self._added.pop(message_id, None)
+            self._removed.add(message_id)
+
+    async def _flush(self, channel_id):
+        """Apaga as mensagens vencidas de um canal (e as que vencem logo em seguida)"""
+        pending = self._channels.get(channel_id)
+        if not pending:
+            return
+        cutoff = time.time() + self.batch_window
+        due = [message_id for message_id, expires_at in pending.items() if expires_at <= cutoff]
+        for message_id in due:
+            del pending[message_id]
+
+        retry = ()
+        async with self._limit:
+            try:
+                retry = set(await self._delete(channel_id, due))
+            except Exception as e:
+                logger.warning("Erro ao apagar mensagens do canal %s: %s", channel_id, e)
+
+        for message_id in due:
+            if message_id not in retry:
+                self._forget(message_id)
+        # Limitado pelo Discord: tenta de novo mais tarde (continua gravado no banco)
+        for message_id in retry:
+            pending[message_id] = time.time() + self.retry_delay
+        if pending:
+            self._arm(channel_id, min(pending.values()))
+        else:
+            self._channels.pop(channel_id, None)
+
+    async def _delete(self, channel_id, message_ids):
+        """
+        Apaga as mensagens: em lotes de até 100 quando o canal permite,
+        uma a uma nos demais casos (DMs, sem permissão, mensagens antigas).
+
+        Returns:
+            list: Mensagens que devem ser tentadas de novo (rate limit)
+        """
+        channel = self.bot.get_channel(channel_id)
+        singles = message_ids
+        if (channel is not None and hasattr(channel, 'delete_messages')
+                and channel_id not in self._no_bulk and len(message_ids) > 1):
+            now = time.time()
+            recent = [m for m in message_ids if now - discord.utils.snowflake_time(m).timestamp() < BULK_MAX_AGE]
+            singles = [m for m in message_ids if now - discord.utils.snowflake_time(m).timestamp() >= BULK_MAX_AGE]
+            for start in range(0, len(recent), BULK_MAX_SIZE):
+                chunk = recent[start:start + BULK_MAX_SIZE]
+                try:
+                    await channel.delete_messages([discord.Object(id=m) for m in chunk])
+                    MESSAGES_DELETED.inc(len(chunk), method='bulk')
+                except discord.Forbidden:
+                    # Sem "Gerenciar mensagens": o bot só consegue apagar as próprias, uma a uma
+                    self._no_bulk.add(channel_id)
+                    singles.extend(recent[start:])
+                    break
+                except discord.HTTPException as e:
+                    if e.status == 429 or e.status >= 500:
+                        return recent[start:] + singles
+                    # Alguma já foi apagada: o lote inteiro falha, então tenta uma a uma
+                    singles.extend(chunk)
+
+        messageable = channel if channel is not None else self.bot.get_partial_messageable(channel_id)
+        for position, message_id in enumerate(singles):
+            try:
+                await messageable.get_partial_message(message_id).delete()
+                MESSAGES_DELETED.inc(method='single')
+            except (discord.NotFound, discord.Forbidden):
+                pass
+            except discord.HTTPException as e:
+                if e.status == 429 or e.status >= 500:
+                    return singles[position:]
+                logger.debug("Erro ao apagar mensagem %s: %s", message_id, e)
+        return []
+
+    async def start(self):
+        """Reagenda as mensagens pendentes do último reinício e inicia a gravação periódica"""
+        if self._db is None or self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(
+            self.executor, lambda: self._db.execute(
+                'SELECT channel_id, message_id, expires_at FROM expiring'
+            ).fetchall()
+        )
+        now = time.time()
+        for channel_id, message_id, expires_at in rows:
+            self._channels.setdefault(channel_id, {})[message_id] = expires_at
+        for channel_id, pending in self._channels.items():
+            self._arm(channel_id, min(pending.values()))
+        if rows:
+            logger.info("%s mensagens temporárias retomadas (%s já vencidas)",
+                        len(rows), sum(1 for row in rows if row[2] <= now))
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+            except Exception as e:
+                logger.error("Erro ao salvar mensagens temporárias: %s", e)
+
+    async def persist(self):
+        """Grava no banco as mensagens agendadas/apagadas desde a última gravação"""
+        if self._db is None or not (self._added or self._removed):
+            return
+        added, self._added = self._added, {}
+        removed, self._removed = self._removed, set()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._write, added, removed)
+
+    def _write(self, added, removed):
+        """Aplica as alterações no banco (roda na thread do agendador)"""
+        self._db.executemany(
+            'INSERT OR REPLACE INTO expiring (message_id, channel_id, expires_at) VALUES (?, ?, ?)',
+            [(message_id, channel_id, expires_at) for message_id, (channel_id, expires_at) in added.items()]
+        )
+        self._db.executemany('DELETE FROM expiring WHERE message_id = ?', [(m,) for m in removed])
+        self._db.commit()
+
+    async def close(self):
+        """Para os timers, grava o que falta e fecha o banco (o pendente é retomado no próximo start)"""
+        self._timers.close()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._db is not None:
+            await self.persist()
+            self.executor.shutdown(wait=True)
+            self._db.close()
+            self._db = None
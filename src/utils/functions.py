@@ -4,6 +4,11 @@ Arquivo contendo funções utilitárias para o projeto.
 import os
 from pathlib import Path
 import sys
+import subprocess
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
 
 def get_project_root() -> Path:
     """
@@ -30,14 +35,37 @@ def get_ffmpeg_path() -> str:
     """
     path = get_resource_path("libraries/ffmpeg/bin/ffmpeg.exe")
     if not os.path.exists(path):
-        print(f"[AVISO] FFmpeg não encontrado em: {path}")
-        print("[AVISO] Tentando instalar FFmpeg...")
+        logger.warning("FFmpeg não encontrado em: %s", path)
+        logger.warning("Tentando instalar FFmpeg...")
         import subprocess
         subprocess.run([sys.executable, "setup.py"])
         if not os.path.exists(path):
             raise FileNotFoundError(f"FFmpeg não encontrado em: {path}")
     return path
 
+@lru_cache(maxsize=None)
+def get_ffmpeg_info(ffmpeg_path: str) -> dict:
+    """
+    Detecta a versão e os recursos do FFmpeg uma única vez (resultado em cache).
+    
+    Args:
+        ffmpeg_path (str): Caminho do executável do FFmpeg
+        
+    Returns:
+        dict: 'version' e 'libopus' (se o FFmpeg foi compilado com libopus),
+              ou None se o FFmpeg não estiver funcionando
+    """
+    try:
+        output = subprocess.check_output([ffmpeg_path, '-version'], timeout=10).decode(errors='replace')
+    except Exception as e:
+        logger.error("FFmpeg não está funcionando corretamente: %s", e)
+        return None
+    parts = output.split()
+    return {
+        'version': parts[2] if len(parts) > 2 else 'desconhecida',
+        'libopus': '--enable-libopus' in output
+    }
+
 def ensure_directory_exists(path: str) -> None:
     """
     Garante que um diretório existe, criando-o se necessário.
@@ -0,0 +1,71 @@
+"""
+Configuração do logging do bot.
+Os módulos só enfileiram os registros (QueueHandler); a formatação e a escrita
+em stdout/arquivo acontecem em uma thread separada (QueueListener), então um
+log nunca bloqueia o event loop. Mensagens abaixo do nível configurado custam
+só a verificação do nível.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+from ..config.settings import LOGGING_SETTINGS
+
+_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que não formata a mensagem na thread de quem loga.
+    O padrão (prepare) formata antes de enfileirar; aqui isso fica para a
+    thread do listener. Como a fila não sai do processo, o registro pode ir
+    como está (inclusive com exc_info).
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(settings=None):
+    """
+    Configura o logging com a fila e a thread de escrita (uma única vez).
+
+    Args:
+        settings (dict): Sobrescreve LOGGING_SETTINGS
+    """
+    global _listener
+    if _listener is not None:
+        return
+    settings = {**LOGGING_SETTINGS, **(settings or {})}
+
+    formatter = logging.Formatter(settings['format'], datefmt=settings['datefmt'])
+    handlers = [logging.StreamHandler()]
+    if settings['file']:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            settings['file'], maxBytes=settings['file_max_bytes'],
+            backupCount=settings['file_backups'], encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(records))
+    root.setLevel(settings['level'])
+    for name, level in settings['levels'].items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Escreve o que ainda estiver na fila ao encerrar
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Para a thread de escrita depois de esvaziar a fila"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,105 @@
+"""
+Agendador de timers baseado em heap.
+Uma única task atende todos os timers, em vez de uma task dormindo por timer.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TimerHeap:
+    """
+    Agenda callbacks por chave: reagendar uma chave substitui o timer anterior.
+    O custo é O(log n) por agendamento e a task só acorda no próximo vencimento.
+    """
+
+    def __init__(self):
+        self._heap = []     # (deadline, seq, key)
+        self._timers = {}   # key -> (deadline, seq, callback)
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def __len__(self):
+        return len(self._timers)
+
+    def schedule(self, key, delay, callback):
+        """
+        Agenda callback() para daqui a `delay` segundos.
+        Se o callback retornar uma coroutine, ela roda em uma nova task.
+        """
+        deadline = time.monotonic() + delay
+        seq = next(self._seq)
+        self._timers[key] = (deadline, seq, callback)
+        heapq.heappush(self._heap, (deadline, seq, key))
+
+        # Descarta entradas antigas quando há muitos reagendamentos
+        if len(self._heap) > 2 * len(self._timers) + 64:
+            self._heap = [(d, s, k) for k, (d, s, _) in self._timers.items()]
+            heapq.heapify(self._heap)
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        elif self._heap[0][1] == seq:
+            # O novo timer é o mais próximo: acorda a task para recalcular a espera
+            self._wakeup.set()
+
+    def cancel(self, key):
+        """Cancela o timer de uma chave. Retorna True se havia um timer armado"""
+        return self._timers.pop(key, None) is not None
+
+    def deadline(self, key):
+        """Retorna o vencimento (time.monotonic) de uma chave, ou None"""
+        timer = self._timers.get(key)
+        return timer[0] if timer else None
+
+    def _pop_stale(self):
+        """Remove do topo do heap entradas canceladas ou substituídas"""
+        while self._heap:
+            deadline, seq, key = self._heap[0]
+            timer = self._timers.get(key)
+            if timer is not None and timer[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    async def _run(self):
+        while True:
+            self._pop_stale()
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            deadline, seq, key = self._heap[0]
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            _, _, callback = self._timers.pop(key)
+            try:
+                result = callback()
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+            except Exception as e:
+                logger.error("Erro ao executar timer %s: %s", key, e)
+
+    def close(self):
+        """Cancela todos os timers e a task do agendador"""
+        self._timers.clear()
+        self._heap.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
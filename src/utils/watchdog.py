@@ -0,0 +1,153 @@
+"""
+Detector de travamentos do event loop.
+Uma task no loop atualiza um batimento a cada `interval` segundos; uma thread
+separada confere o batimento e, quando ele atrasa mais que `threshold`, captura
+a pilha da thread do loop para mostrar qual chamada está bloqueando e de qual
+comando ou método do MusicManager ela veio.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_STALLS = Counter(
+    'amadeus_event_loop_stalls_total', 'Travamentos do event loop por ponto de chamada',
+    labels=('site', 'owner')
+)
+LOOP_STALL_SECONDS = Histogram(
+    'amadeus_event_loop_stall_seconds', 'Duração dos travamentos do event loop',
+    labels=('owner',), buckets=(0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Diretório src/ do projeto: só os frames daqui contam como ponto de chamada
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS_DIR = os.path.join(SRC_DIR, 'bot', 'commands')
+
+
+def _describe(frame):
+    code = frame.f_code
+    path = os.path.relpath(code.co_filename, os.path.dirname(SRC_DIR))
+    return f"{path}:{frame.f_lineno} ({getattr(code, 'co_qualname', code.co_name)})"
+
+
+def attribute(frame):
+    """
+    Identifica o responsável por um travamento a partir da pilha do loop.
+
+    Returns:
+        tuple: (ponto de chamada, responsável) — o ponto é o frame mais interno
+               do projeto; o responsável é o comando em execução ou, sem ele,
+               o método do MusicManager mais externo
+    """
+    site = None
+    command = None
+    method = None
+    innermost = frame
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(SRC_DIR):
+            if site is None:
+                site = _describe(frame)
+            qualname = getattr(code, 'co_qualname', code.co_name)
+            if filename.startswith(COMMANDS_DIR) and qualname.startswith('Music.'):
+                command = qualname.split('.', 1)[1]
+            elif qualname.startswith('MusicManager.'):
+                method = qualname
+        frame = frame.f_back
+
+    if site is None and innermost is not None:
+        site = _describe(innermost)
+    if command:
+        owner = f"comando {command}"
+    else:
+        owner = method or 'desconhecido'
+    return site or 'desconhecido', owner
+
+
+class LoopWatchdog:
+    """
+    Vigia o event loop a partir de uma thread própria.
+    Cada travamento é registrado uma vez (com a pilha) ao passar de `threshold`
+    e de novo, com a duração total, quando o loop volta a responder.
+    """
+
+    def __init__(self, threshold=0.25, interval=0.05, stack_limit=20):
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_limit = stack_limit
+        self.counts = collections.Counter()  # (ponto, responsável) -> travamentos
+
+        self._beat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Inicia o batimento no loop atual e a thread de vigia"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        """Loop da thread de vigia"""
+        stalled_beat = None  # Batimento do travamento em andamento
+        owner = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            if stalled_beat is not None:
+                if beat == stalled_beat:
+                    continue
+                # O loop voltou: registra a duração total
+                duration = beat - stalled_beat
+                LOOP_STALL_SECONDS.observe(duration, owner=owner)
+                logger.warning("Event loop voltou a responder após %.2fs (%s)", duration, owner)
+                stalled_beat = None
+                continue
+
+            if time.monotonic() - beat < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stalled_beat = beat
+            site, owner = attribute(frame)
+            self.counts[site, owner] += 1
+            LOOP_STALLS.inc(site=site, owner=owner)
+            stack = ''.join(traceback.format_stack(frame, limit=self.stack_limit))
+            del frame
+            logger.warning(
+                "Event loop travado há mais de %.2fs em %s (%s, %sª vez):\n%s",
+                self.threshold, site, owner, self.counts[site, owner], stack
+            )
+
+    def top(self, n=10):
+        """Pontos de chamada que mais travaram o loop"""
+        return self.counts.most_common(n)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=1)
+            self._thread = None